@@ -0,0 +1,285 @@
+"""
+Descrição: Suíte de benchmarks do caminho crítico do scanner. Gera quadros sintéticos com QR Code localmente
+e grava os resultados em JSON para comparar versões.
+Description: Benchmark suite for the scanner hot path. Generates synthetic QR Code frames locally
+and writes the results as JSON so releases can be compared.
+
+Uso / Usage:
+    python benchmark.py [--quick] [--output bench.json]
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import tempfile
+import time
+
+import cv2
+import numpy as np
+import pandas as pd
+
+import main
+
+
+def percentiles(samples_ms):
+    """
+    Descrição: Resume uma lista de latências (ms) em contagem, média, p50/p95/p99 e quadros por segundo.
+    Description: Summarizes a list of latencies (ms) into count, mean, p50/p95/p99 and frames per second.
+    """
+    values = np.array(samples_ms, dtype=float)
+    if values.size == 0:
+        return {"n": 0}
+    mean = float(values.mean())
+    return {
+        "n": int(values.size),
+        "mean_ms": round(mean, 4),
+        "p50_ms": round(float(np.percentile(values, 50)), 4),
+        "p95_ms": round(float(np.percentile(values, 95)), 4),
+        "p99_ms": round(float(np.percentile(values, 99)), 4),
+        "per_s": round(1000.0 / mean, 2) if mean > 0 else None,
+    }
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return samples
+
+
+def fake_tracking(i):
+    return f"BR{i:013d}"
+
+
+def synthetic_frame(text, size=(1280, 720), qr_px=300, angle=0.0, blur=0, noise=0.0, seed=0):
+    """
+    Descrição: Gera um quadro BGR com um QR Code, opcionalmente rotacionado, borrado e com ruído.
+    Description: Generates a BGR frame with a QR Code, optionally rotated, blurred and noisy.
+    """
+    w, h = size
+    frame = np.full((h, w, 3), 190, np.uint8)
+    if text:
+        qr = cv2.QRCodeEncoder.create().encode(text)
+        qr = cv2.resize(qr, (qr_px, qr_px), interpolation=cv2.INTER_NEAREST)
+        x0, y0 = (w - qr_px) // 2, (h - qr_px) // 2
+        frame[y0:y0 + qr_px, x0:x0 + qr_px] = cv2.cvtColor(qr, cv2.COLOR_GRAY2BGR)
+    if angle:
+        matrix = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+        frame = cv2.warpAffine(frame, matrix, (w, h), borderValue=(190, 190, 190))
+    if blur:
+        frame = cv2.GaussianBlur(frame, (blur * 2 + 1, blur * 2 + 1), 0)
+    if noise:
+        rng = np.random.default_rng(seed)
+        frame = np.clip(frame + rng.normal(0, noise, frame.shape), 0, 255).astype(np.uint8)
+    return frame
+
+
+class SyntheticSource(main.FrameSource):
+    """
+    Descrição: Fonte de quadros em memória para o benchmark do loop completo (relógio simulado).
+    Description: In-memory frame source for the full-loop benchmark (simulated clock).
+    """
+    def __init__(self, frames, fps=30.0):
+        self.frames = frames
+        self.fps = fps
+        self.index = 0
+
+    def read(self):
+        if self.index >= len(self.frames):
+            return False, None, None
+        img = self.frames[self.index].copy()
+        timestamp = self.index / self.fps
+        self.index += 1
+        return True, img, timestamp
+
+
+def bench_decode(repeat):
+    # Decoders under clean and degraded conditions (noise, blur, rotation)
+    scenarios = {
+        "clean": synthetic_frame(fake_tracking(1)),
+        "noise_blur_rot": synthetic_frame(fake_tracking(2), angle=12, blur=2, noise=12.0, seed=1),
+        "small_code": synthetic_frame(fake_tracking(3), qr_px=140, noise=6.0, seed=2),
+        "empty": synthetic_frame(None, noise=6.0, seed=3),
+    }
+    results = {}
+    for backend in sorted(main.DECODER_BACKENDS):
+        for cascade in (False, True):
+            name = f"cascade:{backend}" if cascade else backend
+            decoder = main.make_decoder(backend, cascade)
+            results[name] = {}
+            for scenario, img in scenarios.items():
+                hits = 0
+                samples = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    objects = decoder.decode(img)
+                    samples.append((time.perf_counter() - start) * 1000.0)
+                    hits += 1 if objects else 0
+                summary = percentiles(samples)
+                summary["read_rate"] = round(hits / repeat, 3)
+                results[name][scenario] = summary
+    return results
+
+
+def bench_check_tracking(sizes, lookups):
+    results = {}
+    rng = np.random.default_rng(0)
+    for rows in sizes:
+        df = pd.DataFrame({
+            "Nº de Rastreio": [fake_tracking(i) for i in range(rows)],
+            "Número da NF-e": [f"{i:09d}" for i in range(rows)],
+            "Nome do Destinatário": ["Cliente"] * rows,
+        })
+        start = time.perf_counter()
+        loader = main.DataLoader.from_dataframe(df)
+        build_ms = (time.perf_counter() - start) * 1000.0
+        hits = [fake_tracking(int(i)) for i in rng.integers(0, rows, lookups)]
+        misses = [fake_tracking(rows + i) for i in range(lookups)]
+        start = time.perf_counter()
+        loader.warm_suggestions()
+        suggest_build_ms = (time.perf_counter() - start) * 1000.0
+        # One misread digit: what a near-miss suggestion has to recover
+        near = [code[:-3] + str((int(code[-3]) + 1) % 10) + code[-2:] for code in hits[:200]]
+        results[str(rows)] = {
+            "index_build_ms": round(build_ms, 2),
+            "hit": percentiles([t for code in hits for t in timed(lambda: loader.check_tracking(code), 1)]),
+            "miss": percentiles([t for code in misses for t in timed(lambda: loader.check_tracking(code), 1)]),
+            "well_formed": percentiles([t for code in hits for t in timed(lambda: loader.is_well_formed(code), 1)]),
+            "suggest_index_build_ms": round(suggest_build_ms, 2),
+            "suggest": percentiles([t for code in near for t in timed(lambda: loader.suggest(code), 1)]),
+        }
+    return results
+
+
+def bench_log(sizes, workdir):
+    # log_scan and the video back-patch as the day's log grows (timed through the station writer)
+    results = {}
+    scanner = main.BarcodeScanner(main.DataLoader.from_dataframe(pd.DataFrame()), video_path=os.path.join(workdir, "v"),
+                                  report_path=os.path.join(workdir, "log"), source=main.FrameSource(), replay=True)
+    written = 0
+    for size in sizes:
+        while written < size:
+            scanner.log_scan(fake_tracking(written), "SUCESSO", f"NF: {written:09d}", nf=f"{written:09d}")
+            written += 1
+        scanner.station.flush()
+        probe = range(written, written + 50)
+        log_samples = [t for i in probe for t in timed(
+            lambda: (scanner.log_scan(fake_tracking(i), "SUCESSO", f"NF: {i:09d}", nf=f"{i:09d}"), scanner.station.flush()), 1)]
+        written += len(probe)
+        video_samples = [t for i in probe for t in timed(
+            lambda: (scanner._update_log_with_video(f"{i:09d}", f"NF{i:09d}.mp4"), scanner.station.flush()), 1)]
+        results[str(size)] = {"log_scan": percentiles(log_samples), "update_log_with_video": percentiles(video_samples)}
+    start = time.perf_counter()
+    scanner.export_log_csv()
+    results["export_csv_ms"] = round((time.perf_counter() - start) * 1000.0, 2)
+    scanner.station.close()
+    shutil.rmtree(scanner.replay_station_dir, ignore_errors=True)
+    return results
+
+
+def bench_video_writer(frames, workdir):
+    img = synthetic_frame(fake_tracking(4), noise=8.0, seed=4)
+    path = os.path.join(workdir, "writer.mp4")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), 20.0, (1280, 720))
+    samples = timed(lambda: writer.write(img), frames)
+    writer.release()
+    summary = percentiles(samples)
+    summary["bytes"] = os.path.getsize(path) if os.path.exists(path) else 0
+    return summary
+
+
+def bench_recording_profiles(frames, workdir):
+    # Every recording profile through the async recorder, fed a 30 fps capture clock
+    images = [synthetic_frame(fake_tracking(5), angle=(i % 5) - 2, noise=8.0, seed=i) for i in range(8)]
+    results = {}
+    for name, profile in sorted(main.RECORDING_PROFILES.items()):
+        recorder = main.AsyncVideoRecorder(blocking=True)
+        recorder.open(os.path.join(workdir, f"profile_{name}.mp4"), profile, (1280, 720))
+        for i in range(frames):
+            recorder.write(images[i % len(images)], i / 30.0)
+        recorder.shutdown()
+        results[name] = recorder.stats()["profiles"].get(name, {})
+    return results
+
+
+def bench_run_loop(frames, workdir):
+    # Full run() iteration in replay mode: decode, state machine, overlay, recording
+    loader = main.DataLoader.from_dataframe(pd.DataFrame({
+        "Nº de Rastreio": [fake_tracking(i) for i in range(1000)],
+        "Número da NF-e": [f"{i:09d}" for i in range(1000)],
+        "Nome do Destinatário": ["Cliente"] * 1000,
+    }))
+    # Empty bench, then a package held long enough to record, then empty again
+    lead, held = frames // 6, frames // 2
+    code_frames = [synthetic_frame(fake_tracking(7), angle=(i % 5) - 2, noise=5.0, seed=i) for i in range(8)]
+    empty = synthetic_frame(None, noise=5.0, seed=99)
+    sequence = [empty] * lead + [code_frames[i % len(code_frames)] for i in range(held)] + [empty] * (frames - lead - held)
+
+    results = {}
+    for mode in ("gated", "untracked", "ungated", "governed"):
+        out = os.path.join(workdir, f"run_{mode}")
+        scanner = main.BarcodeScanner(loader, video_path=os.path.join(out, "v"), report_path=out,
+                                      source=SyntheticSource(sequence), replay=True)
+        if mode == "untracked":
+            scanner.decode_gate = main.DecodeGate(track=False)
+        elif mode == "ungated":
+            scanner.decode_gate = None
+        elif mode == "governed":
+            scanner.governor = main.FrameBudgetGovernor() # Off by default in replay
+        scanner.run()
+        stats = scanner.run_stats
+        results[mode] = {
+            "frames": stats["frames"],
+            "fps": stats["fps"],
+            "ms_per_frame": round(stats["elapsed_s"] * 1000.0 / max(1, stats["frames"]), 3),
+            "recorder": stats["recorder"],
+            "decode_gate": stats["decode_gate"],
+            "governor": stats["governor"],
+        }
+    return results
+
+
+def run_benchmarks(quick=False):
+    """
+    Descrição: Executa todos os benchmarks e retorna um dicionário serializável em JSON.
+    Description: Runs every benchmark and returns a JSON-serializable dict.
+    """
+    workdir = tempfile.mkdtemp(prefix="bench_conferencia_")
+    try:
+        repeat = 10 if quick else 50
+        report = {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "opencv": cv2.__version__,
+            "quick": quick,
+            "decode": bench_decode(repeat),
+            "check_tracking": bench_check_tracking([1_000, 100_000] if quick else [1_000, 100_000, 1_000_000], 2_000),
+            "log": bench_log([1_000, 10_000] if quick else [1_000, 10_000, 50_000], workdir),
+            "video_writer": bench_video_writer(30 if quick else 200, workdir),
+            "recording_profiles": bench_recording_profiles(60 if quick else 300, workdir),
+            "run_loop": bench_run_loop(180 if quick else 450, workdir),
+        }
+        return report
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks da Conferência Gueddai")
+    parser.add_argument("--quick", action="store_true", help="Execução reduzida (menos repetições e tamanhos)")
+    parser.add_argument("--output", default=None, help="Arquivo JSON de saída (padrão: stdout)")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.quick)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"Resultados gravados em {args.output}")
+    else:
+        print(text)
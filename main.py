@@ -8,26 +8,305 @@ except ImportError:
     print("Aviso: tkinterdnd2 nao instalado. Drag and Drop desativado.")
 import cv2
 import pandas as pd
+import openpyxl
 import numpy as np
 from pyzbar.pyzbar import decode, ZBarSymbol
 import datetime
 import os
 import time
 import shutil
+import hashlib
+import json
+import threading
+import sqlite3
+import csv
+import re
+import glob
+import argparse
+import queue
+import cProfile
+import contextlib
+import pstats
+import io
+import bisect
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from collections import deque, namedtuple, OrderedDict
+
+class SpreadsheetCache:
+    """
+    Descrição: Cache em disco (colunar, .npz) das colunas normalizadas da planilha, para evitar reler o Excel a cada início.
+    Description: On-disk columnar (.npz) cache of the normalized spreadsheet columns, to avoid re-reading the Excel file at every start.
+    """
+    CACHE_VERSION = 1
+
+    def __init__(self, cache_dir=".cache_planilhas"):
+        self.cache_dir = cache_dir
+
+    def _cache_path(self, filepath):
+        key = hashlib.sha1(os.path.abspath(filepath).encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    @staticmethod
+    def file_hash(filepath):
+        """
+        Descrição: Calcula o hash SHA-256 do conteúdo do arquivo.
+        Description: Computes the SHA-256 hash of the file contents.
+        """
+        h = hashlib.sha256()
+        with open(filepath, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def load(self, filepath, columns):
+        """
+        Descrição: Retorna o DataFrame em cache se o arquivo não mudou (tamanho, mtime ou hash), senão None.
+        Description: Returns the cached DataFrame if the file is unchanged (size, mtime or hash), otherwise None.
+        """
+        cache_path = self._cache_path(filepath)
+        if not os.path.exists(cache_path):
+            return None
+
+        try:
+            st = os.stat(filepath)
+            with np.load(cache_path, allow_pickle=False) as data:
+                meta = json.loads(str(data["meta"]))
+                if meta.get("version") != self.CACHE_VERSION or meta.get("columns") != list(columns):
+                    return None
+                if meta.get("path") != os.path.abspath(filepath) or meta.get("size") != st.st_size:
+                    return None
+                # Copy everything out: the cache file must be closed before it can be replaced (Windows)
+                arrays = {name: data[name] for name in data.files if name != "meta"}
+
+            if meta.get("mtime_ns") != st.st_mtime_ns:
+                # File was touched: only trust the cache if the content is identical
+                if self.file_hash(filepath) != meta.get("sha256"):
+                    return None
+                meta["mtime_ns"] = st.st_mtime_ns
+                self._write(cache_path, meta, arrays)
+
+            return pd.DataFrame({
+                col: self._restore_column(arrays[f"col{i}"], arrays[f"null{i}"])
+                for i, col in enumerate(columns)
+            })
+        except Exception as e:
+            print(f"Aviso: cache da planilha ignorado ({e}).")
+            return None
+
+    def save(self, filepath, df, columns):
+        """
+        Descrição: Grava as colunas normalizadas em cache, com a chave (caminho, tamanho, mtime, hash).
+        Description: Writes the normalized columns to the cache, keyed by (path, size, mtime, hash).
+        """
+        try:
+            if not os.path.exists(self.cache_dir):
+                os.makedirs(self.cache_dir)
+
+            st = os.stat(filepath)
+            meta = {
+                "version": self.CACHE_VERSION,
+                "path": os.path.abspath(filepath),
+                "size": st.st_size,
+                "mtime_ns": st.st_mtime_ns,
+                "sha256": self.file_hash(filepath),
+                "columns": list(columns),
+            }
+            arrays = {}
+            for i, col in enumerate(columns):
+                series = df[col]
+                arrays[f"null{i}"] = series.isna().to_numpy(dtype=bool)
+                arrays[f"col{i}"] = series.fillna("").astype(str).to_numpy(dtype=str)
+            self._write(self._cache_path(filepath), meta, arrays)
+        except Exception as e:
+            print(f"Aviso: não foi possível gravar cache da planilha: {e}")
+
+    def _write(self, cache_path, meta, arrays):
+        # Write to a temp file and swap, so a crash never leaves a half-written cache
+        tmp_path = cache_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, meta=np.array(json.dumps(meta)), **arrays)
+        os.replace(tmp_path, cache_path)
+
+    @staticmethod
+    def _restore_column(values, nulls):
+        column = values.astype(object)
+        column[nulls] = np.nan
+        return column
+
+class TrackingCodeFilter:
+    """
+    Descrição: Pré-filtro barato de formato dos rastreios: formatos conhecidos (S10 dos Correios com dígito verificador, BR + 12 dígitos + caractere) e os formatos presentes na planilha carregada.
+    Description: Cheap tracking-code format pre-filter: known formats (Correios S10 with check digit, BR + 12 digits + character) and the shapes present in the loaded spreadsheet.
+    """
+    S10 = re.compile(r"^[A-Z]{2}\d{9}[A-Z]{2}$")
+    PATTERNS = [re.compile(r"^BR\d{12}[0-9A-Z]$")]
+    S10_WEIGHTS = (8, 6, 4, 2, 3, 5, 9, 7)
+    # Shape of a code: every digit becomes "9" and every letter "A" (C-speed via str.translate)
+    SHAPE_TABLE = str.maketrans("0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz", "9" * 10 + "A" * 52)
+
+    def __init__(self, codes=()):
+        self.shapes = set(code.translate(self.SHAPE_TABLE) for code in codes)
+
+    @classmethod
+    def s10_check_ok(cls, code):
+        # UPU S10: 8 serial digits weighted 8,6,4,2,3,5,9,7; check = 11 - sum % 11 (10 -> 0, 11 -> 5)
+        digits = code[2:11]
+        check = 11 - sum(int(d) * w for d, w in zip(digits[:8], cls.S10_WEIGHTS)) % 11
+        if check == 10:
+            check = 0
+        elif check == 11:
+            check = 5
+        return check == int(digits[8])
+
+    def is_well_formed(self, code):
+        """
+        Descrição: Indica se a leitura tem um formato de rastreio válido (leituras parciais ou corrompidas são rejeitadas).
+        Description: Tells whether the read has a valid tracking format (partial or corrupted reads are rejected).
+        """
+        if self.S10.match(code):
+            return self.s10_check_ok(code)
+        if any(pattern.match(code) for pattern in self.PATTERNS):
+            return True
+        if not self.shapes:
+            return True # Nothing loaded to learn from: do not reject
+        return code.translate(self.SHAPE_TABLE) in self.shapes
+
+class NearMissIndex:
+    """
+    Descrição: Índice de distância de edição (pombal) sobre os rastreios: cada código é partido em k+1 pedaços; qualquer código a até k edições compartilha um pedaço intacto. Sugere os pedidos mais próximos de um rastreio não encontrado em milissegundos.
+    Description: Edit-distance (pigeonhole) index over the tracking codes: each code is split into k+1 chunks; any code within k edits shares one intact chunk. Suggests the nearest orders for a tracking code that was not found, in milliseconds.
+    """
+    ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+    def __init__(self, codes, max_distance=2, max_candidates=5000):
+        self.max_distance = max_distance
+        self.max_candidates = max_candidates # Above this, a dense archive would cost more to verify than the suggestion is worth
+        self.codes = codes if isinstance(codes, (set, dict)) else set(codes)
+        self.groups = {} # length -> (chunk bounds, [chunk -> codes])
+        by_length = {}
+        for code in codes:
+            by_length.setdefault(len(code), []).append(code)
+        for length, group in by_length.items():
+            # Skip the prefix every code shares ("BR..."): chunks there would not discriminate
+            start = len(os.path.commonprefix(group)) if len(group) > 1 else 0
+            body = length - start
+            n = max_distance + 1
+            if body >= n:
+                bounds = [(start + body * i // n, start + body * (i + 1) // n) for i in range(n)]
+            else:
+                bounds = [(start, length)]
+            tables = [{} for _ in bounds]
+            for code in group:
+                for table, (a, b) in zip(tables, bounds):
+                    table.setdefault(code[a:b], []).append(code)
+            self.groups[length] = (bounds, tables)
+
+    @staticmethod
+    def levenshtein(a, b, bound):
+        """
+        Descrição: Distância de edição entre a e b, ou bound + 1 assim que ela com certeza passar de bound.
+        Description: Edit distance between a and b, or bound + 1 as soon as it is certain to exceed bound.
+        """
+        if abs(len(a) - len(b)) > bound:
+            return bound + 1
+        prev = list(range(len(b) + 1))
+        for i, ca in enumerate(a, 1):
+            cur = [i]
+            for j, cb in enumerate(b, 1):
+                cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+            if min(cur) > bound:
+                return bound + 1
+            prev = cur
+        return prev[-1]
+
+    def suggest(self, code, limit=3):
+        """
+        Descrição: Até `limit` rastreios a no máximo `max_distance` edições, como [(distância, rastreio)], do mais próximo ao mais distante. Em acervos muito densos (mais de `max_candidates` a verificar) só volta os que estão a uma edição.
+        Description: Up to `limit` tracking codes within `max_distance` edits, as [(distance, code)], nearest first. On very dense archives (more than `max_candidates` to verify) only codes one edit away are returned.
+        """
+        k = self.max_distance
+        # One edit away: generate every variant and look it up, cost independent of how dense the codes are
+        found = {variant: 1 for variant in self.neighbours(code) if variant in self.codes}
+        if len(found) >= limit or k < 2:
+            return sorted((d, c) for c, d in found.items())[:limit]
+        candidates = set()
+        for length, (bounds, tables) in self.groups.items():
+            if abs(length - len(code)) > k:
+                continue
+            for table, (a, b) in zip(tables, bounds):
+                # Insertions/deletions before a chunk shift it by up to k positions
+                for shift in range(-k, k + 1):
+                    if a + shift < 0 or b + shift > len(code):
+                        continue
+                    bucket = table.get(code[a + shift:b + shift])
+                    if bucket:
+                        candidates.update(bucket)
+        scored = [(d, c) for c, d in found.items()]
+        if len(candidates) <= self.max_candidates:
+            for candidate in candidates.difference(found):
+                distance = self.levenshtein(code, candidate, k)
+                if distance <= k:
+                    scored.append((distance, candidate))
+        scored.sort()
+        return scored[:limit]
+
+    def neighbours(self, code):
+        """
+        Descrição: Todos os códigos a exatamente uma edição (troca, remoção ou inserção de um caractere) de `code`.
+        Description: Every code exactly one edit (substitution, deletion or insertion of a character) away from `code`.
+        """
+        for i in range(len(code) + 1):
+            head, tail = code[:i], code[i:]
+            for ch in self.ALPHABET:
+                yield head + ch + tail
+            if tail:
+                yield head + tail[1:]
+                for ch in self.ALPHABET:
+                    if ch != tail[0]:
+                        yield head + ch + tail[1:]
 
 class DataLoader:
-    def __init__(self, filepath):
+    def __init__(self, filepath, cache_dir=".cache_planilhas", progress=None):
+        self._init_state(filepath, SpreadsheetCache(cache_dir) if cache_dir else None, progress)
+        self.load_data()
+        
+        """
+        Descrição: Inicializa o carregador de dados com o caminho do arquivo.
+        Description: Initializes the data loader with the file path.
+        """
+
+    def _init_state(self, filepath, cache, progress):
+        # Shared by both constructors: every new attribute goes here
         self.filepath = filepath
+        self.progress = progress # Optional callback(rows_read, total_rows or None), called from the loading thread
         self.df = None
+        self.cache = cache
         self.tracking_column = "Nº de Rastreio"
         self.nf_column = "Número da NF-e"
         self.dest_column = "Nome do Destinatário"
-        self.load_data()
-        
+        self.tracking_index = {} # tracking -> (nf, destinatario)
+        self.nf_index = {} # nf -> [tracking, ...]
+        self.version = 0 # Bumped every time the index is rebuilt
+        self.file_state = None # (mtime_ns, size) of the file the index was built from
+        self.change_log = deque(maxlen=32) # (version, changed tracking codes, or None for a full rebuild)
+        self.change_lock = threading.Lock()
+        self.code_filter = TrackingCodeFilter()
+        self._near_index = None # (version, NearMissIndex), built on demand
+        self._near_lock = threading.Lock()
+
+    @classmethod
+    def from_dataframe(cls, df):
         """
-        Descrição: Inicializa o carregador de dados com o caminho do arquivo.
-        Description: Initializes the data loader with the file path.
+        Descrição: Cria um carregador a partir de um DataFrame já carregado (sem arquivo).
+        Description: Builds a loader from an already loaded DataFrame (no file).
         """
+        loader = cls.__new__(cls)
+        loader._init_state(None, None, None)
+        loader.df = df
+        loader.build_index()
+        return loader
 
     def load_data(self):
         """
@@ -39,44 +318,191 @@ class DataLoader:
             self.df = pd.DataFrame(columns=[self.tracking_column, self.nf_column, self.dest_column])
             return
 
+        cols = [self.tracking_column, self.nf_column, self.dest_column]
+        self.file_state = self._stat_file()
+
+        # Fast path: reuse the parsed columns if the spreadsheet did not change
+        if self.cache:
+            cached_df = self.cache.load(self.filepath, cols)
+            if cached_df is not None:
+                self.df = cached_df
+                print(f"Sucesso: {len(self.df)} registros carregados (cache).")
+                self.build_index()
+                return
+
         try:
-            # Load only necessary columns, as string to preserve leading zeros
-            cols = [self.tracking_column, self.nf_column, self.dest_column]
-            
-            self.df = pd.read_excel(
-                self.filepath, 
-                dtype=str,
-                usecols=lambda x: x.strip() in cols # basic filter
-            )
-            
-            # Verify if all columns were found; if not, retry loading all and filtering manually to catch case differences
-            if len(self.df.columns) < len(cols):
-                 print("Recarregando para buscar colunas case-insensitive...")
-                 temp_df = pd.read_excel(self.filepath, dtype=str)
-                 col_map = {}
-                 for actual in temp_df.columns:
-                     for target in cols:
-                         if actual.strip().lower() == target.lower():
-                             col_map[actual] = target
-                 
-                 if len(col_map) < len(cols):
-                     print("ERRO CRÍTICO: Colunas obrigatórias faltando no Excel!")
-                     print(f"Esperado: {cols}")
-                     print(f"Encontrado mapeamento: {col_map}")
-                 
-                 temp_df.rename(columns=col_map, inplace=True)
-                 self.df = temp_df[cols]
+            # Stream only the needed columns, row by row, as text to preserve leading zeros
+            self.df = self.read_columns_streaming(cols)
 
             # Remove rows with empty tracking numbers
             self.df.dropna(subset=[self.tracking_column], inplace=True)
             self.df[self.tracking_column] = self.df[self.tracking_column].astype(str).str.strip()
             
             print(f"Sucesso: {len(self.df)} registros carregados.")
+
+            if self.cache:
+                self.cache.save(self.filepath, self.df, cols)
             
         except Exception as e:
             print(f"Erro ao carregar Excel: {e}")
             self.df = pd.DataFrame(columns=[cols])
 
+        self.build_index()
+
+    @staticmethod
+    def _cell_text(value):
+        # Same text pandas produces with dtype=str: integral floats lose the ".0", empty cells stay missing
+        if value is None:
+            return None
+        if isinstance(value, float) and value.is_integer():
+            return str(int(value))
+        return str(value)
+
+    def read_columns_streaming(self, cols):
+        """
+        Descrição: Lê só as colunas pedidas, linha a linha (openpyxl em modo somente leitura), sem carregar a planilha inteira na memória. Nomes de coluna sem diferenciar maiúsculas.
+        Description: Reads only the requested columns, row by row (openpyxl read-only mode), without loading the whole workbook in memory. Column names are matched case-insensitively.
+        """
+        wb = openpyxl.load_workbook(self.filepath, read_only=True, data_only=True)
+        try:
+            ws = wb.worksheets[0] # Same sheet pd.read_excel picks by default
+            # Row count from the sheet's dimension tag: only a progress hint, it may be missing or stale
+            total = ws.max_row - 1 if ws.max_row and ws.max_row > 1 else None
+            # Read-only mode stops at the tag's last row/column, and ERP exports often write a wrong one
+            # ("A1:A1", or an old range after rows were added): always read up to the real end of the sheet
+            ws.reset_dimensions()
+            rows = ws.iter_rows(values_only=True)
+            header = next(rows, None) or ()
+
+            wanted = {c.lower(): c for c in cols}
+            positions = {}
+            for i, name in enumerate(header):
+                target = wanted.get(str(name).strip().lower()) if name is not None else None
+                if target and target not in positions:
+                    positions[target] = i
+            if len(positions) < len(cols):
+                print("ERRO CRÍTICO: Colunas obrigatórias faltando no Excel!")
+                print(f"Esperado: {cols}")
+                print(f"Encontrado mapeamento: {positions}")
+
+            data = {c: [] for c in cols}
+            picks = [(data[c], positions.get(c)) for c in cols]
+            count = 0
+            for row in rows:
+                for values, i in picks:
+                    values.append(self._cell_text(row[i]) if i is not None and i < len(row) else None)
+                count += 1
+                if self.progress and count % 2000 == 0:
+                    self.progress(count, total if total and count <= total else None)
+            if self.progress:
+                self.progress(count, count)
+        finally:
+            wb.close()
+        return pd.DataFrame(data, columns=cols)
+
+    def build_index(self):
+        """
+        Descrição: Constrói os índices em memória (rastreio -> NF/destinatário e NF -> rastreios) para buscas O(1).
+        Description: Builds the in-memory indexes (tracking -> NF/recipient and NF -> trackings) for O(1) lookups.
+        """
+        self.tracking_index, self.nf_index = self._build_indexes(self.df)
+        self.code_filter = TrackingCodeFilter(self.tracking_index)
+        with self.change_lock:
+            self.change_log.append((self.version + 1, None))
+            self.version += 1
+
+    def _build_indexes(self, df):
+        tracking_index = {}
+        nf_index = {}
+        if df is None or df.empty:
+            return tracking_index, nf_index
+
+        try:
+            trackings = df[self.tracking_column].tolist()
+            nfs = df[self.nf_column].tolist()
+            dests = df[self.dest_column].tolist()
+        except KeyError as e:
+            print(f"Erro ao indexar planilha: coluna {e} ausente.")
+            return tracking_index, nf_index
+
+        for tracking, nf, dest in zip(trackings, nfs, dests):
+            # First occurrence wins, same as the previous iloc[0] lookup
+            if tracking not in tracking_index:
+                tracking_index[tracking] = (nf, dest)
+            nf_trackings = nf_index.setdefault(nf, [])
+            if tracking not in nf_trackings:
+                nf_trackings.append(tracking)
+        return tracking_index, nf_index
+
+    def _stat_file(self):
+        try:
+            st = os.stat(self.filepath)
+        except (OSError, TypeError):
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def changed_on_disk(self):
+        """
+        Descrição: Indica se o arquivo da planilha mudou (mtime/tamanho) desde a última carga.
+        Description: Tells whether the spreadsheet file changed (mtime/size) since the last load.
+        """
+        return self.filepath is not None and self._stat_file() != self.file_state
+
+    def reload_changes(self):
+        """
+        Descrição: Relê a planilha, compara linha a linha com o índice atual e troca os índices de uma vez. Retorna {"added", "removed", "changed"} (rastreios) ou None se falhar.
+        Description: Re-reads the spreadsheet, diffs it row by row against the current index and swaps the indexes in one step. Returns {"added", "removed", "changed"} (trackings) or None on failure.
+        """
+        state = self._stat_file()
+        if state is None:
+            return None
+        cols = [self.tracking_column, self.nf_column, self.dest_column]
+        try:
+            df = self.read_columns_streaming(cols)
+            df.dropna(subset=[self.tracking_column], inplace=True)
+            df[self.tracking_column] = df[self.tracking_column].astype(str).str.strip()
+        except Exception as e:
+            print(f"Erro ao recarregar planilha: {e}")
+            return None
+
+        tracking_index, nf_index = self._build_indexes(df)
+        code_filter = TrackingCodeFilter(tracking_index)
+        old = self.tracking_index
+        added = tracking_index.keys() - old.keys()
+        removed = old.keys() - tracking_index.keys()
+        changed = {code for code in tracking_index.keys() & old.keys() if tracking_index[code] != old[code]}
+
+        # Swap: every lookup reads a single dict reference, so it sees either the old or the new index
+        self.df = df
+        self.tracking_index = tracking_index
+        self.nf_index = nf_index
+        self.code_filter = code_filter
+        self.file_state = state
+        with self.change_lock:
+            self.change_log.append((self.version + 1, added | removed | changed))
+            self.version += 1
+
+        print(f"Planilha recarregada: {len(added)} novos, {len(removed)} removidos, {len(changed)} alterados.")
+        if self.cache:
+            self.cache.save(self.filepath, df, cols)
+        self.warm_suggestions() # Already off the UI thread
+        return {"added": added, "removed": removed, "changed": changed}
+
+    def changes_since(self, version, upto=None):
+        """
+        Descrição: Rastreios alterados entre `version` e `upto` (padrão: versão atual), ou None se houve reconstrução completa ou o histórico não cobre o intervalo.
+        Description: Tracking codes changed between `version` and `upto` (default: current version), or None if there was a full rebuild or the log does not cover the range.
+        """
+        with self.change_lock:
+            upto = self.version if upto is None else upto
+            log = dict(self.change_log)
+        codes = set()
+        for v in range(version + 1, upto + 1):
+            if log.get(v) is None:
+                return None
+            codes |= log[v]
+        return codes
+
     def check_tracking(self, tracking_code):
         """
         Descrição: Verifica se o código de rastreio existe na base de dados.
@@ -85,18 +511,64 @@ class DataLoader:
         if self.df is None or self.df.empty:
             return None
         
-        # Search for the tracking code
-        result = self.df[self.df[self.tracking_column] == tracking_code]
+        # Hash lookup on the prebuilt index (no pandas work per code)
+        entry = self.tracking_index.get(tracking_code)
         
-        if not result.empty:
-            row = result.iloc[0]
+        if entry is not None:
+            nf, dest = entry
             return {
-                "nf": row[self.nf_column],
-                "destinatario": row[self.dest_column],
+                "nf": nf,
+                "destinatario": dest,
                 "found": True
             }
         return {"found": False}
 
+    def is_well_formed(self, tracking_code):
+        """
+        Descrição: Pré-filtro de formato, aplicado antes de qualquer busca. Um código presente na planilha é sempre aceito; as regras de formato/dígito verificador só valem para os demais.
+        Description: Format pre-filter, applied before any lookup. A code present in the spreadsheet is always accepted; the format/check-digit rules only apply to the others.
+        """
+        if tracking_code in self.tracking_index:
+            return True
+        return self.code_filter.is_well_formed(tracking_code)
+
+    def warm_suggestions(self):
+        """
+        Descrição: Constrói (se desatualizado) o índice de sugestões para a versão atual da planilha. Pode rodar em segundo plano.
+        Description: Builds (if stale) the suggestion index for the current spreadsheet version. Safe to run in the background.
+        """
+        with self._near_lock:
+            version, tracking_index = self.version, self.tracking_index
+            if self._near_index is None or self._near_index[0] != version:
+                self._near_index = (version, NearMissIndex(tracking_index))
+            return self._near_index[1]
+
+    def suggest(self, tracking_code, limit=3):
+        """
+        Descrição: Pedidos mais próximos (distância de edição) de um rastreio não encontrado: [(rastreio, nf)]. Nunca espera a construção do índice: usa o da versão anterior (ou nenhum) enquanto o novo é montado em segundo plano.
+        Description: Nearest orders (edit distance) to a tracking code that was not found: [(tracking, nf)]. Never waits for the index build: uses the previous version's index (or none) while the new one is built in the background.
+        """
+        near = self._near_index
+        if near is None or near[0] != self.version:
+            if not self._near_lock.locked(): # Otherwise a build is already running
+                threading.Thread(target=self.warm_suggestions, name="suggestions-build", daemon=True).start()
+            if near is None:
+                return []
+        suggestions = []
+        # A stale index may return removed orders: every hit is re-checked against the current rows
+        for _, code in near[1].suggest(tracking_code, limit):
+            entry = self.tracking_index.get(code)
+            if entry is not None:
+                suggestions.append((code, entry[0]))
+        return suggestions
+
+    def find_by_nf(self, nf):
+        """
+        Descrição: Retorna os códigos de rastreio associados a uma NF (lista vazia se não existir).
+        Description: Returns the tracking codes associated with an NF (empty list if missing).
+        """
+        return list(self.nf_index.get(nf, []))
+
 class ScannerButton:
     def __init__(self, text, x, y, w, h, bg_color, text_color):
         self.text = text
@@ -113,176 +585,2732 @@ class ScannerButton:
         bx, by, bw, bh = self.rect
         return bx <= cx <= bx+bw and by <= cy <= by+bh
 
-class BarcodeScanner:
-    def __init__(self, data_loader, video_path="videos_auditoria", report_path="."):
-        self.cap = cv2.VideoCapture(0)
-        self.cap.set(3, 1280) # Width
-        self.cap.set(4, 720)  # Height
-        self.data_loader = data_loader
-        self.scanned_items = set() # To store scanned items in this session
-        self.last_scan_time = {} # For debounce UI logic
-        
-        # --- PATH CONFIGURATION ---
-        self.report_dir = report_path
-        if not os.path.exists(self.report_dir):
-            os.makedirs(self.report_dir)
-            
-        self.video_dir = video_path
-        if not os.path.exists(self.video_dir):
-            os.makedirs(self.video_dir)
-            
-        self.log_file = os.path.join(self.report_dir, f"conferencia_log_{datetime.datetime.now().strftime('%Y-%m-%d')}.csv")
-        self.font = cv2.FONT_HERSHEY_SIMPLEX
-        
-        # --- LOGGING SETUP ---
-        if not os.path.exists(self.log_file):
-            with open(self.log_file, "w", encoding='utf-8') as f:
-                f.write("Timestamp,Rastreio,Status,Mensagem,Video_Evidence\n")
+class DropOldestQueue:
+    """
+    Descrição: Fila limitada e thread-safe que descarta o item mais antigo quando está cheia.
+    Description: Bounded thread-safe queue that drops the oldest item when full.
+    """
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.dropped = 0
+        self.closed = False
+        self._items = deque()
+        self._cond = threading.Condition()
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """
+        Descrição: Retira o item mais antigo, ou retorna None se a fila estiver vazia após o timeout.
+        Description: Pops the oldest item, or returns None if the queue is still empty after the timeout.
+        """
+        with self._cond:
+            if not self._items and not self.closed and timeout != 0:
+                self._cond.wait_for(lambda: self._items or self.closed, timeout)
+            if self._items:
+                return self._items.popleft()
+            return None
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._items)
+
+class PreRollBuffer:
+    """
+    Descrição: Buffer circular de quadros recentes comprimidos em JPEG, limitado por duração e por memória.
+    Description: Ring buffer of recent JPEG-compressed frames, bounded by duration and by memory.
+    """
+    def __init__(self, seconds=3.0, max_bytes=48 * 1024 * 1024, jpeg_quality=85):
+        self.seconds = seconds
+        self.max_bytes = max_bytes
+        self.jpeg_quality = jpeg_quality
+        self._frames = deque() # (timestamp, jpeg bytes)
+        self.total_bytes = 0
+
+    def push(self, timestamp, frame):
+        ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        if not ok:
+            return
+        data = buf.tobytes()
+        self._frames.append((timestamp, data))
+        self.total_bytes += len(data)
+
+        # Evict by age, then by memory budget
+        while self._frames and (timestamp - self._frames[0][0] > self.seconds or self.total_bytes > self.max_bytes):
+            _, old = self._frames.popleft()
+            self.total_bytes -= len(old)
+
+    def drain(self):
+        """
+        Descrição: Retorna os quadros decodificados como (timestamp, quadro), do mais antigo ao mais recente, e esvazia o buffer.
+        Description: Returns the decoded frames as (timestamp, frame), oldest to newest, and empties the buffer.
+        """
+        frames = []
+        while self._frames:
+            timestamp, data = self._frames.popleft()
+            frame = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+            if frame is not None:
+                frames.append((timestamp, frame))
+        self.total_bytes = 0
+        return frames
+
+    def clear(self):
+        self._frames.clear()
+        self.total_bytes = 0
+
+    def __len__(self):
+        return len(self._frames)
+
+RecordingProfile = namedtuple("RecordingProfile", ["name", "width", "fps", "codec", "grayscale"])
+
+# width None keeps the capture resolution; "h264" goes through ffmpeg when it is installed
+RECORDING_PROFILES = {
+    "padrao": RecordingProfile("padrao", None, 20.0, "mp4v", False),
+    "economico": RecordingProfile("economico", 960, 10.0, "h264", False),
+    "arquivo": RecordingProfile("arquivo", 640, 5.0, "h264", True),
+}
+
+def recording_size(profile, size):
+    """
+    Descrição: Resolução de saída do perfil para quadros de captura `size` (dimensões pares, exigidas pelo H.264 4:2:0).
+    Description: Profile output resolution for capture frames of `size` (even dimensions, required by H.264 4:2:0).
+    """
+    w, h = size
+    if profile.width and profile.width < w:
+        h = int(round(h * profile.width / w))
+        w = profile.width
+    return (w - w % 2, h - h % 2)
+
+class FFmpegPipeWriter:
+    """
+    Descrição: Escritor de vídeo H.264 via subprocesso do ffmpeg (quadros crus pelo stdin), com a mesma interface do cv2.VideoWriter.
+    Description: H.264 video writer through an ffmpeg subprocess (raw frames over stdin), with the same interface as cv2.VideoWriter.
+    """
+    def __init__(self, filepath, fps, size, grayscale=False, crf=28, preset="veryfast"):
+        self.size = size
+        cmd = [
+            "ffmpeg", "-loglevel", "error", "-y",
+            "-f", "rawvideo", "-pix_fmt", "gray" if grayscale else "bgr24",
+            "-s", f"{size[0]}x{size[1]}", "-r", str(fps), "-i", "-",
+            "-an", "-c:v", "libx264", "-preset", preset, "-crf", str(crf),
+            "-pix_fmt", "yuv420p", "-movflags", "+faststart", filepath,
+        ]
+        try:
+            self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+        except Exception as e:
+            print(f"Aviso: ffmpeg indisponível ({e}).")
+            self.proc = None
+
+    def isOpened(self):
+        return self.proc is not None and self.proc.poll() is None
+
+    def write(self, frame):
+        if self.proc is not None:
+            self.proc.stdin.write(np.ascontiguousarray(frame).tobytes())
+
+    def release(self):
+        if self.proc is not None:
+            try:
+                self.proc.stdin.close()
+                self.proc.wait(timeout=30)
+            except Exception as e:
+                print(f"Erro ao finalizar ffmpeg: {e}")
+            self.proc = None
+
+def open_video_writer(filepath, profile, size):
+    """
+    Descrição: Abre o escritor do perfil: ffmpeg/H.264 quando pedido e disponível, senão o cv2.VideoWriter (mp4v).
+    Description: Opens the profile's writer: ffmpeg/H.264 when requested and available, otherwise cv2.VideoWriter (mp4v).
+    """
+    if profile.codec == "h264" and shutil.which("ffmpeg"):
+        writer = FFmpegPipeWriter(filepath, profile.fps, size, grayscale=profile.grayscale)
+        if writer.isOpened():
+            return writer
+    codec = "mp4v" if profile.codec == "h264" else profile.codec
+    return cv2.VideoWriter(filepath, cv2.VideoWriter_fourcc(*codec), profile.fps, size, not profile.grayscale)
+
+class AsyncVideoRecorder:
+    """
+    Descrição: Gravador de vídeo assíncrono: o cv2.VideoWriter vive em uma thread própria e recebe quadros por uma fila limitada.
+    Description: Asynchronous video recorder: the cv2.VideoWriter lives on its own thread and receives frames through a bounded queue.
+    """
+    SLOT_EPSILON = 1e-6 # Seconds; float rounding between capture timestamps and the fps grid
+
+    def __init__(self, max_queue=120, preroll=None, blocking=False, perf=None, max_gap_seconds=10.0,
+                 max_queue_bytes=96 * 1024 * 1024):
+        self.max_queue = max_queue # Max frames waiting to be encoded
+        self.max_queue_bytes = max_queue_bytes # Memory budget for those raw frames (~35 frames at 1280x720)
+        self.max_gap_seconds = max_gap_seconds # Longer capture gaps are not filled with duplicates
+        self.perf = perf # Optional PerfMonitor, receives the per-frame encode time
+        self.blocking = blocking # Wait for room instead of dropping (offline replay)
+        self.preroll = preroll # Optional PreRollBuffer, flushed at the start of every file
+        self.dropped_frames = 0
+        self.dropped_preroll = 0
+        self.written_frames = 0
+        self.max_queue_depth = 0
+        self._items = deque() # (kind, payload) commands, in order
+        self._pending_frames = 0
+        self._pending_bytes = 0
+        self._cond = threading.Condition()
+        self._thread = None
+        self._writer = None
+        self._file_frames = 0
+        self._file_path = None
+        self._profile = None
+        self._out_size = None
+        self._file_encode_ms = 0.0
+        self._next_slot = None # Capture time of the next output frame (fps grid)
+        self._grid_start = None # Capture time of slot 0 of the current grid
+        self._slot_index = 0
+        self._held = None # [timestamp, frame, prepared frame or None, written?]
+        self._sidecar = None # Real capture timestamp of every output frame
+        self.decimated_frames = 0
+        self.duplicated_frames = 0
+        self.profile_totals = {} # profile name -> files/frames/bytes/seconds/encode_ms
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._worker, name="video-recorder", daemon=True)
+            self._thread.start()
+
+    def _put(self, kind, payload):
+        with self._cond:
+            self._items.append((kind, payload))
+            self._cond.notify()
+
+    def open(self, filepath, profile, size):
+        """
+        Descrição: Abre um novo arquivo de vídeo com o perfil de gravação dado (fecha o anterior, se houver).
+        Description: Opens a new video file with the given recording profile (closes the previous one, if any).
+        """
+        self._ensure_thread()
+        self._put("open", (filepath, profile, size))
+
+    def _has_room(self, frame):
+        # Called with _cond held; a single oversized frame is still accepted into an empty queue
+        if self._pending_frames >= self.max_queue:
+            return False
+        return self._pending_frames == 0 or self._pending_bytes + frame.nbytes <= self.max_queue_bytes
+
+    def write(self, frame, timestamp=None):
+        """
+        Descrição: Enfileira um quadro para gravação. Se a fila estiver cheia (quadros ou memória), o quadro é descartado e contabilizado.
+        Description: Queues a frame for writing. If the queue is full (frame count or memory budget), the frame is dropped and counted.
+        """
+        with self._cond:
+            if self.blocking:
+                self._cond.wait_for(lambda: self._has_room(frame))
+            if not self._has_room(frame):
+                self.dropped_frames += 1
+                return False
+            self._items.append(("frame", (timestamp, frame)))
+            self._pending_frames += 1
+            self._pending_bytes += frame.nbytes
+            self.max_queue_depth = max(self.max_queue_depth, self._pending_frames)
+            self._cond.notify()
+        return True
+
+    def push_preroll(self, timestamp, frame):
+        """
+        Descrição: Enfileira um quadro para o buffer de pré-gravação (comprimido na thread do gravador).
+        Description: Queues a frame for the pre-roll buffer (compressed on the recorder thread).
+        """
+        if self.preroll is None:
+            return False
+        with self._cond:
+            if self.blocking:
+                self._ensure_thread()
+                self._cond.wait_for(lambda: self._has_room(frame))
+            if not self._has_room(frame):
+                self.dropped_preroll += 1
+                return False
+            self._items.append(("preroll", (timestamp, frame)))
+            self._pending_frames += 1
+            self._pending_bytes += frame.nbytes
+            self._cond.notify()
+        self._ensure_thread()
+        return True
+
+    def close(self, on_finalized=None):
+        """
+        Descrição: Finaliza o arquivo atual na thread do gravador e depois chama on_finalized().
+        Description: Finalizes the current file on the recorder thread and then calls on_finalized().
+        """
+        self._ensure_thread()
+        self._put("close", on_finalized)
+
+    def shutdown(self, timeout=None):
+        """
+        Descrição: Grava os quadros pendentes, finaliza o arquivo aberto e encerra a thread.
+        Description: Flushes pending frames, finalizes the open file and stops the thread.
+        """
+        if self._thread is None or not self._thread.is_alive():
+            return
+        self._put("stop", None)
+        self._thread.join(timeout)
+
+    @property
+    def queue_depth(self):
+        with self._cond:
+            return self._pending_frames
+
+    def stats(self):
+        """
+        Descrição: Retorna os contadores do gravador (profundidade da fila, quadros gravados e descartados).
+        Description: Returns the recorder counters (queue depth, written and dropped frames).
+        """
+        with self._cond:
+            return {
+                "queue_depth": self._pending_frames,
+                "queue_bytes": self._pending_bytes,
+                "max_queue_depth": self.max_queue_depth,
+                "written_frames": self.written_frames,
+                "dropped_frames": self.dropped_frames,
+                "dropped_preroll": self.dropped_preroll,
+                "preroll_frames": len(self.preroll) if self.preroll is not None else 0,
+                "preroll_bytes": self.preroll.total_bytes if self.preroll is not None else 0,
+                "decimated_frames": self.decimated_frames,
+                "duplicated_frames": self.duplicated_frames,
+                "profiles": {name: self._profile_summary(t) for name, t in self.profile_totals.items()},
+            }
+
+    @staticmethod
+    def _profile_summary(totals):
+        return {
+            "files": totals["files"],
+            "frames": totals["frames"],
+            "bytes_per_s": round(totals["bytes"] / totals["seconds"]) if totals["seconds"] > 0 else 0,
+            "encode_ms_per_frame": round(totals["encode_ms"] / totals["frames"], 3) if totals["frames"] else 0.0,
+        }
+
+    @staticmethod
+    def sidecar_path(video_path):
+        return os.path.splitext(video_path)[0] + ".timestamps.csv"
+
+    def _release(self):
+        if self._writer is not None:
+            # The last held frame still owes its slot
+            if self._held is not None and not self._held[3]:
+                self._emit(self._held, self._next_slot)
+            self._held = None
+            self._writer.release()
+            self._writer = None
+            if self._sidecar is not None:
+                self._sidecar.close()
+                self._sidecar = None
+            size_bytes = os.path.getsize(self._file_path) if os.path.exists(self._file_path) else 0
+            seconds = self._file_frames / self._profile.fps
+            totals = self.profile_totals.setdefault(self._profile.name, {"files": 0, "frames": 0, "bytes": 0, "seconds": 0.0, "encode_ms": 0.0})
+            totals["files"] += 1
+            totals["frames"] += self._file_frames
+            totals["bytes"] += size_bytes
+            totals["seconds"] += seconds
+            totals["encode_ms"] += self._file_encode_ms
+            rate = size_bytes / seconds / 1024 if seconds > 0 else 0.0
+            cost = self._file_encode_ms / self._file_frames if self._file_frames else 0.0
+            print(f"Vídeo finalizado: {self._file_frames} quadros, {rate:.0f} KB/s, {cost:.1f} ms/quadro "
+                  f"(perfil {self._profile.name}, descartados na sessão: {self.dropped_frames}).")
+
+    def _pace(self, frame, timestamp):
+        """
+        Descrição: Ritmo do arquivo pelo relógio de captura: cada quadro de saída (grade de 1/fps) mostra o quadro mais recente capturado até aquele instante, duplicando ou descartando conforme o loop esteja lento ou rápido.
+        Description: Paces the file by the capture clock: each output frame (1/fps grid) shows the newest frame captured up to that instant, duplicating or dropping as the loop runs slow or fast.
+        """
+        if timestamp is None:
+            # No clock (direct use): one frame in, one frame out
+            self._emit([None, frame, None, False], None)
+            return
+        interval = 1.0 / self._profile.fps
+        held = self._held
+        if held is None:
+            self._restart_grid(timestamp)
+        elif timestamp - self._next_slot > self.max_gap_seconds:
+            # Capture stalled for too long: show the held frame once and restart the grid
+            if not held[3]:
+                self._emit(held, self._next_slot)
+            self._restart_grid(timestamp)
         else:
-             with open(self.log_file, 'r', encoding='utf-8') as f:
-                 header = f.readline()
-             if "Video_Evidence" not in header:
-                 df_log = pd.read_csv(self.log_file)
-                 df_log["Video_Evidence"] = ""
-                 df_log.to_csv(self.log_file, index=False)
-        
-        self.load_scanned_items()
+            # A frame landing on its slot (within rounding) belongs to that slot, not the held one
+            while self._next_slot < timestamp - self.SLOT_EPSILON:
+                self._emit(held, self._next_slot)
+                # From the slot index, not by summing intervals: the sum drifts and duplicates frames at matching rates
+                self._slot_index += 1
+                self._next_slot = self._grid_start + self._slot_index * interval
+            if not held[3]:
+                self.decimated_frames += 1 # Superseded before its slot came up
+        self._held = [timestamp, frame, None, False]
 
-        self.scan_results_cache = {} # code -> (status_text, header_color, rect_color, NF)
-        
-        # --- NAVIGATION STATE ---
-        self.nav_action = None # 'home', 'gallery', or None (quit)
-        self.buttons = []
+    def _restart_grid(self, timestamp):
+        self._grid_start = timestamp
+        self._slot_index = 0
+        self._next_slot = timestamp
 
-        # --- RECORDING SETUP ---
-        self.is_recording = False
-        self.video_writer = None
-        
-        # Active Recording State
-        self.current_recording_nf = None 
-        self.last_nf_seen_time = 0
-        self.post_scan_buffer = 3.0 # Segundos para gravar após a NF sair da tela
-        self.current_video_filename = None
-        
-        # Stability Check State
-        self.current_candidate_nf = None
-        self.candidate_start_time = 0
-        self.stability_duration = 2.0 # Seconds to hold before recording starts
+    def _emit(self, held, slot_time):
+        # Encodes the held frame for one output slot (prepared once, reused for duplicates)
+        start = time.perf_counter()
+        if held[2] is None:
+            frame = held[1]
+            if (frame.shape[1], frame.shape[0]) != self._out_size:
+                frame = cv2.resize(frame, self._out_size, interpolation=cv2.INTER_AREA)
+            if self._profile.grayscale and frame.ndim == 3:
+                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            held[2] = frame
+        self._writer.write(held[2])
+        elapsed_ms = (time.perf_counter() - start) * 1000.0
+        self._file_encode_ms += elapsed_ms
+        if self.perf is not None:
+            self.perf.record("encode", elapsed_ms)
+        duplicate = held[3]
+        if duplicate:
+            self.duplicated_frames += 1
+        held[3] = True
+        if self._sidecar is not None and held[0] is not None:
+            self._sidecar.write(f"{self._file_frames},{held[0]:.6f},{slot_time:.6f},{int(duplicate)}\n")
+        self._file_frames += 1
+        self.written_frames += 1
 
-    def load_scanned_items(self):
+    def _worker(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._items)
+                kind, payload = self._items.popleft()
+                if kind in ("frame", "preroll"):
+                    self._pending_frames -= 1
+                    self._pending_bytes -= payload[1].nbytes
+                    self._cond.notify_all() # Wake a blocked producer
+
+            profiling = self.perf.thread_profile() if self.perf is not None else contextlib.nullcontext()
+            try:
+                with profiling:
+                    if kind == "frame":
+                        if self._writer is not None:
+                            self._pace(payload[1], payload[0])
+                    elif kind == "preroll":
+                        if self.preroll is not None:
+                            self.preroll.push(*payload)
+                    elif kind == "open":
+                        self._release()
+                        filepath, profile, size = payload
+                        self._profile = profile
+                        self._out_size = recording_size(profile, size)
+                        self._file_path = filepath
+                        self._writer = open_video_writer(filepath, profile, self._out_size)
+                        self._file_frames = 0
+                        self._file_encode_ms = 0.0
+                        self._next_slot = None
+                        self._held = None
+                        try:
+                            self._sidecar = open(self.sidecar_path(filepath), "w", encoding="utf-8")
+                            self._sidecar.write("quadro,timestamp_captura,timestamp_saida,duplicado\n")
+                        except Exception as e:
+                            print(f"Aviso: sidecar de timestamps não criado ({e}).")
+                            self._sidecar = None
+                        if self.preroll is not None:
+                            # The new file starts with the moments before the trigger (hold period)
+                            for timestamp, frame in self.preroll.drain():
+                                self._pace(frame, timestamp)
+                    elif kind == "close":
+                        self._release()
+                        if payload:
+                            payload()
+                    elif kind == "stop":
+                        self._release()
+                        break
+            except Exception as e:
+                print(f"Erro no gravador de vídeo: {e}")
+
+DecodedCode = namedtuple("DecodedCode", ["data", "type", "rect", "polygon"])
+CodeRect = namedtuple("CodeRect", ["left", "top", "width", "height"])
+
+class QRDecoder:
+    """
+    Descrição: Interface base dos decodificadores de QR Code. Mede a latência de cada chamada.
+    Description: Base interface for QR Code decoders. Measures the latency of every call.
+    """
+    name = "base"
+
+    def __init__(self, history=300):
+        self.last_latency_ms = 0.0
+        self.latencies = deque(maxlen=history)
+        self.calls = 0
+        self.hits = 0
+
+    def decode(self, img):
+        start = time.perf_counter()
+        objects = self._decode(img)
+        self.last_latency_ms = (time.perf_counter() - start) * 1000.0
+        self.latencies.append(self.last_latency_ms)
+        self.calls += 1
+        if objects:
+            self.hits += 1
+        return objects
+
+    def _decode(self, img):
+        raise NotImplementedError
+
+    def stats(self):
+        """
+        Descrição: Retorna latência média/p95 (ms) e taxa de leitura das últimas chamadas.
+        Description: Returns mean/p95 latency (ms) and read rate over the recent calls.
+        """
+        if not self.latencies:
+            return {"backend": self.name, "calls": 0, "mean_ms": 0.0, "p95_ms": 0.0, "hit_rate": 0.0}
+        values = np.array(self.latencies)
+        return {
+            "backend": self.name,
+            "calls": self.calls,
+            "last_ms": round(self.last_latency_ms, 2),
+            "mean_ms": round(float(values.mean()), 2),
+            "p95_ms": round(float(np.percentile(values, 95)), 2),
+            "hit_rate": round(self.hits / self.calls, 3),
+        }
+
+class PyzbarDecoder(QRDecoder):
+    """
+    Descrição: Decodificador baseado no pyzbar/zbar (somente QR Code).
+    Description: pyzbar/zbar based decoder (QR Code only).
+    """
+    name = "pyzbar"
+
+    def _decode(self, img):
+        return decode(img, symbols=[ZBarSymbol.QRCODE])
+
+class OpenCVDecoder(QRDecoder):
+    """
+    Descrição: Decodificador baseado no cv2.QRCodeDetector (detectAndDecodeMulti).
+    Description: cv2.QRCodeDetector based decoder (detectAndDecodeMulti).
+    """
+    name = "opencv"
+
+    def __init__(self, history=300):
+        super().__init__(history)
+        self.detector = cv2.QRCodeDetector()
+
+    def _decode(self, img):
+        ok, texts, points, _ = self.detector.detectAndDecodeMulti(img)
+        if not ok or points is None:
+            return []
+        objects = []
+        for text, pts in zip(texts, points):
+            if not text:
+                continue # Detected but not readable
+            polygon = [(int(x), int(y)) for x, y in pts]
+            xs = [p[0] for p in polygon]
+            ys = [p[1] for p in polygon]
+            rect = CodeRect(min(xs), min(ys), max(xs) - min(xs), max(ys) - min(ys))
+            objects.append(DecodedCode(text.encode("utf-8"), "QRCODE", rect, polygon))
+        return objects
+
+class CascadeDecoder(QRDecoder):
+    """
+    Descrição: Estratégia em cascata: passada rápida em cinza reduzido; resolução total e contraste realçado só se falhar.
+    Description: Cascade strategy: fast downscaled grayscale pass first; full resolution and contrast-enhanced passes only on miss.
+    """
+    def __init__(self, backend, downscale=0.5, history=300):
+        super().__init__(history)
+        self.backend = backend
+        self.downscale = downscale
+        self.name = f"cascade:{backend.name}"
+        self.clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+        self.pass_hits = {"downscaled": 0, "full": 0, "enhanced": 0, "miss": 0}
+
+    @staticmethod
+    def _scale(objects, factor):
+        scaled = []
+        for obj in objects:
+            polygon = [(int(p[0] * factor), int(p[1] * factor)) for p in obj.polygon]
+            xs = [p[0] for p in polygon]
+            ys = [p[1] for p in polygon]
+            rect = obj.rect._replace(left=min(xs), top=min(ys), width=max(xs) - min(xs), height=max(ys) - min(ys))
+            scaled.append(obj._replace(polygon=polygon, rect=rect))
+        return scaled
+
+    def _decode(self, img):
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+
+        # 1. Cheap pass: downscaled grayscale
+        if 0 < self.downscale < 1:
+            small = cv2.resize(gray, None, fx=self.downscale, fy=self.downscale, interpolation=cv2.INTER_AREA)
+            objects = self.backend.decode(small)
+            if objects:
+                self.pass_hits["downscaled"] += 1
+                return self._scale(objects, 1.0 / self.downscale)
+
+        # 2. Full resolution grayscale
+        objects = self.backend.decode(gray)
+        if objects:
+            self.pass_hits["full"] += 1
+            return objects
+
+        # 3. Contrast enhanced (CLAHE) for glare / poor lighting
+        objects = self.backend.decode(self.clahe.apply(gray))
+        if objects:
+            self.pass_hits["enhanced"] += 1
+            return objects
+
+        self.pass_hits["miss"] += 1
+        return []
+
+    def stats(self):
+        result = super().stats()
+        result["passes"] = dict(self.pass_hits)
+        result["backend_stats"] = self.backend.stats()
+        return result
+
+DECODER_BACKENDS = {
+    "pyzbar": PyzbarDecoder,
+    "opencv": OpenCVDecoder,
+}
+
+def make_decoder(backend="pyzbar", cascade=False):
+    """
+    Descrição: Cria o decodificador configurado ("pyzbar" ou "opencv"), opcionalmente em cascata.
+    Description: Builds the configured decoder ("pyzbar" or "opencv"), optionally wrapped in the cascade strategy.
+    """
+    if backend not in DECODER_BACKENDS:
+        raise ValueError(f"Decodificador desconhecido: {backend}. Opções: {', '.join(DECODER_BACKENDS)}")
+    decoder = DECODER_BACKENDS[backend]()
+    if cascade:
+        decoder = CascadeDecoder(decoder)
+    return decoder
+
+class CodeTracker:
+    """
+    Descrição: Segue os polígonos dos códigos já lidos entre quadros com fluxo óptico esparso (Lucas-Kanade), sem chamar o decodificador.
+    Description: Follows the polygons of already decoded codes across frames with sparse optical flow (Lucas-Kanade), without calling the decoder.
+    """
+    def __init__(self, max_points=40, min_points=8, min_confidence=0.6, max_fb_error=1.0):
+        self.max_points = max_points
+        self.min_points = min_points # Fewer surviving points than this: tracking is lost
+        self.min_confidence = min_confidence # Fraction of points that must track cleanly
+        self.max_fb_error = max_fb_error # Forward-backward error (px) above which a point is dropped
+        self.lk_params = dict(winSize=(21, 21), maxLevel=2,
+                              criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03))
+        self.reset()
+
+    def reset(self):
+        self._previous = None # Gray crop of the tracking window on the last frame
+        self._points = None
+        self._objects = []
+        self._window = None # (x0, y0, x1, y1): fixed while tracking, set by the last real decode
+        self.confidence = 0.0
+
+    @property
+    def active(self):
+        return self._previous is not None
+
+    def _crop(self, img):
+        x0, y0, x1, y1 = self._window
+        crop = img[y0:y1, x0:x1]
+        if crop.ndim == 3:
+            crop = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+        return crop
+
+    def start(self, img, objects, window):
+        """
+        Descrição: Começa a seguir os códigos recém-decodificados, com pontos de canto dentro dos polígonos. Retorna False se não houver textura suficiente.
+        Description: Starts following freshly decoded codes, using corner points inside their polygons. Returns False if there is not enough texture.
+        """
+        self.reset()
+        if not objects or window is None:
+            return False
+        self._window = window
+        x0, y0 = window[0], window[1]
+        gray = self._crop(img)
+        mask = np.zeros(gray.shape, np.uint8)
+        for obj in objects:
+            polygon = np.array([(p[0] - x0, p[1] - y0) for p in obj.polygon], np.int32)
+            cv2.fillPoly(mask, [polygon], 255)
+        points = cv2.goodFeaturesToTrack(gray, self.max_points, 0.01, 5, mask=mask)
+        if points is None or len(points) < self.min_points:
+            self.reset()
+            return False
+        self._previous = gray
+        self._points = points.astype(np.float32)
+        self._objects = objects
+        self.confidence = 1.0
+        return True
+
+    def track(self, img):
+        """
+        Descrição: Move os polígonos para o quadro atual. Retorna os códigos com as novas posições, ou None se a confiança caiu (o chamador deve decodificar de novo).
+        Description: Moves the polygons to the current frame. Returns the codes at their new positions, or None if confidence dropped (the caller should decode again).
+        """
+        if not self.active:
+            return None
+        gray = self._crop(img)
+        if gray.shape != self._previous.shape:
+            self.reset() # Frame size changed under us
+            return None
+        moved, status, _ = cv2.calcOpticalFlowPyrLK(self._previous, gray, self._points, None, **self.lk_params)
+        back, status_back, _ = cv2.calcOpticalFlowPyrLK(gray, self._previous, moved, None, **self.lk_params)
+        fb_error = np.linalg.norm((self._points - back).reshape(-1, 2), axis=1)
+        good = (status.ravel() == 1) & (status_back.ravel() == 1) & (fb_error < self.max_fb_error)
+        self.confidence = float(good.mean())
+        if good.sum() < self.min_points or self.confidence < self.min_confidence:
+            self.reset()
+            return None
+        matrix, inliers = cv2.estimateAffinePartial2D(self._points[good], moved[good])
+        if matrix is None or inliers.mean() < self.min_confidence:
+            self.reset()
+            return None
+
+        x0, y0, x1, y1 = self._window
+        objects = []
+        for obj in self._objects:
+            local = np.array([(p[0] - x0, p[1] - y0) for p in obj.polygon], np.float32).reshape(-1, 1, 2)
+            local = cv2.transform(local, matrix).reshape(-1, 2)
+            polygon = [(int(round(x)) + x0, int(round(y)) + y0) for x, y in local]
+            xs = [p[0] for p in polygon]
+            ys = [p[1] for p in polygon]
+            if min(xs) < x0 or min(ys) < y0 or max(xs) > x1 or max(ys) > y1:
+                self.reset() # Walking out of the window: let a real decode re-center it
+                return None
+            rect = obj.rect._replace(left=min(xs), top=min(ys), width=max(xs) - min(xs), height=max(ys) - min(ys))
+            objects.append(obj._replace(polygon=polygon, rect=rect))
+
+        self._previous = gray
+        self._points = moved[good].reshape(-1, 1, 2)
+        self._objects = objects
+        return objects
+
+class DecodeGate:
+    """
+    Descrição: Controla quando e onde decodificar: pula o zbar em quadros sem movimento e restringe a busca à região do último código.
+    Description: Controls when and where to decode: skips zbar on motionless frames and restricts the search to the last code's region.
+    """
+    def __init__(self, motion_threshold=2.5, full_search_interval=15, roi_margin=0.5, probe_size=(160, 90),
+                 track=True, redecode_interval=5):
+        self.motion_threshold = motion_threshold # Mean abs diff (0-255) on the downscaled frame
+        self.full_search_interval = full_search_interval # Force a full-frame search every N gated frames
+        self.roi_margin = roi_margin # ROI padding, as a fraction of the code's size
+        self.probe_size = probe_size
+        self.tracker = CodeTracker() if track else None # Follows a held code between real decodes
+        self.redecode_interval = redecode_interval # Confirm a tracked code with zbar every N tracked frames
+        self.reset()
+
+    def reset(self):
+        self._reference = None # Downscaled gray frame at the last real decode
+        self._last_objects = []
+        self._last_bbox = None
+        self._since_full = 0
+        self._since_decode = 0
+        if self.tracker is not None:
+            self.tracker.reset()
+        self.stats = {"full": 0, "roi": 0, "tracked": 0, "skipped": 0}
+
+    def _probe(self, img):
+        small = cv2.resize(img, self.probe_size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return small
+
+    def _bbox(self, objects, shape):
+        xs = [p[0] for obj in objects for p in obj.polygon]
+        ys = [p[1] for obj in objects for p in obj.polygon]
+        if not xs:
+            return None
+        h, w = shape[:2]
+        pad_x = int((max(xs) - min(xs)) * self.roi_margin) + 16
+        pad_y = int((max(ys) - min(ys)) * self.roi_margin) + 16
+        x0, y0 = max(0, min(xs) - pad_x), max(0, min(ys) - pad_y)
+        x1, y1 = min(w, max(xs) + pad_x), min(h, max(ys) + pad_y)
+        if x1 <= x0 or y1 <= y0:
+            return None
+        return (x0, y0, x1, y1)
+
+    @staticmethod
+    def _offset(objects, dx, dy):
+        # Map ROI coordinates back to full-frame coordinates
+        shifted = []
+        for obj in objects:
+            polygon = [(p[0] + dx, p[1] + dy) for p in obj.polygon]
+            rect = obj.rect._replace(left=obj.rect.left + dx, top=obj.rect.top + dy)
+            shifted.append(obj._replace(polygon=polygon, rect=rect))
+        return shifted
+
+    def decode(self, img, decode_fn):
+        """
+        Descrição: Decodifica o quadro usando decode_fn apenas quando necessário (movimento sem rastreio confiável, ROI ou busca periódica).
+        Description: Decodes the frame with decode_fn only when needed (motion without reliable tracking, ROI or periodic full search).
+        """
+        probe = self._probe(img)
+        self._since_full += 1
+        force_full = self._since_full >= self.full_search_interval
+
+        if not force_full and self._reference is not None:
+            motion = float(cv2.absdiff(probe, self._reference).mean())
+            if motion < self.motion_threshold:
+                # Nothing changed since the last decode: reuse its result
+                self.stats["skipped"] += 1
+                return self._last_objects
+
+        if not force_full and self.tracker is not None and self.tracker.active and self._since_decode < self.redecode_interval:
+            # A code is being held and moving: follow it instead of decoding it again
+            tracked = self.tracker.track(img)
+            if tracked is not None:
+                self.stats["tracked"] += 1
+                self._since_decode += 1
+                self._reference = probe
+                self._last_objects = tracked
+                self._last_bbox = self._bbox(tracked, img.shape)
+                return tracked
+            # Tracking confidence dropped: fall through to a real decode
+
+        objects = None
+        if not force_full and self._last_bbox is not None:
+            # A code is being held: search only around its last position
+            x0, y0, x1, y1 = self._last_bbox
+            objects = decode_fn(img[y0:y1, x0:x1])
+            self.stats["roi"] += 1
+            if objects:
+                objects = self._offset(objects, x0, y0)
+            else:
+                objects = None # Lost it: fall back to a full search
+
+        if objects is None:
+            objects = decode_fn(img)
+            self.stats["full"] += 1
+            self._since_full = 0
+
+        self._reference = probe
+        self._last_objects = objects
+        self._last_bbox = self._bbox(objects, img.shape) if objects else None
+        self._since_decode = 0
+        if self.tracker is not None:
+            if objects:
+                self.tracker.start(img, objects, self._last_bbox)
+            else:
+                self.tracker.reset()
+        return objects
+
+class ScanLogStore:
+    """
+    Descrição: Armazenamento indexado (SQLite em modo WAL) dos eventos de conferência, com exportação para o CSV diário.
+    Description: Indexed store (SQLite in WAL mode) for scan events, with export to the daily CSV.
+    """
+    CSV_HEADER = ["Timestamp", "Rastreio", "Status", "Mensagem", "Video_Evidence"]
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.lock = threading.Lock() # Shared by the UI loop and the recorder thread
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS scans (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                day TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                rastreio TEXT NOT NULL,
+                status TEXT NOT NULL,
+                mensagem TEXT,
+                nf TEXT,
+                video_evidence TEXT DEFAULT ''
+            );
+            CREATE INDEX IF NOT EXISTS idx_scans_rastreio ON scans(rastreio);
+            CREATE INDEX IF NOT EXISTS idx_scans_nf_day ON scans(nf, day, status);
+            CREATE INDEX IF NOT EXISTS idx_scans_day ON scans(day, status);
+        """)
+        self.conn.commit()
+
+    @staticmethod
+    def nf_from_message(message):
+        match = re.search(r"NF:?\s*(\S+)", str(message))
+        return match.group(1) if match else None
+
+    def add_scan(self, timestamp, tracking, status, message, nf=None, video_evidence=""):
+        """
+        Descrição: Insere um evento de conferência e retorna seu id.
+        Description: Inserts a scan event and returns its id.
+        """
+        if nf is None:
+            nf = self.nf_from_message(message)
+        with self.lock:
+            cur = self.conn.execute(
+                "INSERT INTO scans (day, timestamp, rastreio, status, mensagem, nf, video_evidence) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (timestamp[:10], timestamp, tracking, status, message, nf, video_evidence or ""),
+            )
+            self.conn.commit()
+            return cur.lastrowid
+
+    def attach_video(self, nf, video_filename, day):
+        """
+        Descrição: Associa o vídeo de evidência aos registros SUCESSO da NF no dia (update por chave).
+        Description: Attaches the evidence video to the NF's SUCESSO rows for the day (keyed update).
+        """
+        with self.lock:
+            cur = self.conn.execute(
+                "UPDATE scans SET video_evidence = ? WHERE nf = ? AND status = 'SUCESSO' AND day = ?",
+                (video_filename, nf, day),
+            )
+            self.conn.commit()
+            return cur.rowcount
+
+    def successful_codes(self, day):
+        """
+        Descrição: Retorna os rastreios conferidos com SUCESSO no dia.
+        Description: Returns the tracking codes checked with SUCESSO on the day.
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT DISTINCT rastreio FROM scans WHERE day = ? AND status = 'SUCESSO'", (day,)
+            ).fetchall()
+        return {row[0].strip() for row in rows}
+
+    def count(self, day):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM scans WHERE day = ?", (day,)).fetchone()[0]
+
+    def import_csv(self, csv_path, day):
+        """
+        Descrição: Importa um log CSV existente (formato antigo) para o banco, se o dia ainda estiver vazio.
+        Description: Imports an existing CSV log (legacy format) into the store, if the day is still empty.
+        """
+        if not os.path.exists(csv_path) or self.count(day) > 0:
+            return 0
+        rows = []
+        with open(csv_path, "r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                message = row.get("Mensagem") or ""
+                rows.append((
+                    day,
+                    row.get("Timestamp") or "",
+                    (row.get("Rastreio") or "").strip(),
+                    row.get("Status") or "",
+                    message,
+                    self.nf_from_message(message),
+                    row.get("Video_Evidence") or "",
+                ))
+        with self.lock:
+            self.conn.executemany(
+                "INSERT INTO scans (day, timestamp, rastreio, status, mensagem, nf, video_evidence) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self.conn.commit()
+        return len(rows)
+
+    def export_csv(self, csv_path, day):
+        """
+        Descrição: Exporta os eventos do dia no formato CSV original (Timestamp,Rastreio,Status,Mensagem,Video_Evidence).
+        Description: Exports the day's events in the original CSV format (Timestamp,Rastreio,Status,Mensagem,Video_Evidence).
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT timestamp, rastreio, status, mensagem, video_evidence FROM scans WHERE day = ? ORDER BY id", (day,)
+            ).fetchall()
+        tmp_path = csv_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f, lineterminator="\n")
+            writer.writerow(self.CSV_HEADER)
+            for row in rows:
+                writer.writerow(["" if v is None else v for v in row])
+        os.replace(tmp_path, csv_path)
+        return len(rows)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+class BloomFilter:
+    """
+    Descrição: Filtro de Bloom (bits em numpy) para descartar rapidamente códigos que certamente não foram vistos.
+    Description: Bloom filter (numpy bit array) to quickly rule out codes that were certainly never seen.
+    """
+    def __init__(self, capacity=2_000_000, error_rate=0.01, bits=None):
+        self.num_bits = max(8, int(-capacity * np.log(error_rate) / (np.log(2) ** 2)))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * np.log(2))))
+        self.bits = bits if bits is not None else np.zeros((self.num_bits + 7) // 8, dtype=np.uint8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= (1 << (pos & 7))
+
+    def __contains__(self, key):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+class DuplicateIndex:
+    """
+    Descrição: Índice persistente de rastreios já conferidos (todos os dias), em SQLite com um filtro de Bloom à frente.
+    Description: Persistent index of already checked tracking codes (all days), in SQLite with a Bloom filter in front.
+    """
+    def __init__(self, db_path, capacity=2_000_000):
+        self.db_path = db_path
+        self.bloom_path = os.path.splitext(db_path)[0] + ".bloom.npz"
+        self.capacity = capacity
+        self.lock = threading.Lock()
+        self._confirmed = set() # Positives already confirmed against the table
+        self.listeners = [] # Called with each newly added code
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS scanned (
+                rastreio TEXT PRIMARY KEY,
+                nf TEXT,
+                day TEXT NOT NULL
+            )
+        """)
+        self.conn.commit()
+        self.bloom = self._load_bloom()
+
+    def _last_rowid(self):
+        return self.conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM scanned").fetchone()[0]
+
+    def _load_bloom(self):
+        # The persisted filter is only valid if it saw exactly the rows currently in the table
+        last_rowid = self._last_rowid()
+        if os.path.exists(self.bloom_path):
+            try:
+                with np.load(self.bloom_path, allow_pickle=False) as data:
+                    if int(data["last_rowid"]) == last_rowid and int(data["capacity"]) == self.capacity:
+                        return BloomFilter(self.capacity, bits=data["bits"].copy())
+            except Exception as e:
+                print(f"Aviso: filtro de duplicatas será reconstruído ({e}).")
+
+        bloom = BloomFilter(self.capacity)
+        for (code,) in self.conn.execute("SELECT rastreio FROM scanned"):
+            bloom.add(code)
+        return bloom
+
+    def save(self):
+        """
+        Descrição: Persiste o filtro de Bloom em disco para abertura instantânea na próxima sessão.
+        Description: Persists the Bloom filter to disk for instant opening in the next session.
+        """
+        with self.lock:
+            tmp_path = self.bloom_path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                np.savez(f, bits=self.bloom.bits, last_rowid=np.int64(self._last_rowid()), capacity=np.int64(self.capacity))
+            os.replace(tmp_path, self.bloom_path)
+
+    def __contains__(self, code):
+        if code in self._confirmed:
+            return True
+        if code not in self.bloom:
+            return False # Definitely never scanned
+        with self.lock:
+            row = self.conn.execute("SELECT 1 FROM scanned WHERE rastreio = ?", (code,)).fetchone()
+        if row:
+            self._confirmed.add(code)
+            return True
+        return False
+
+    def add(self, code, nf=None, day=None):
+        """
+        Descrição: Marca um rastreio como conferido (idempotente).
+        Description: Marks a tracking code as checked (idempotent).
+        """
+        day = day or datetime.datetime.now().strftime("%Y-%m-%d")
+        with self.lock:
+            self.conn.execute("INSERT OR IGNORE INTO scanned (rastreio, nf, day) VALUES (?, ?, ?)", (code, nf, day))
+            self.conn.commit()
+        self.bloom.add(code)
+        self._confirmed.add(code)
+        for listener in self.listeners:
+            listener(code)
+
+    def update(self, codes, day=None):
+        """
+        Descrição: Marca vários rastreios de uma vez (usado na importação de logs antigos).
+        Description: Marks several tracking codes at once (used when importing old logs).
+        """
+        rows = [(code, None, day or datetime.datetime.now().strftime("%Y-%m-%d")) for code in codes]
+        if not rows:
+            return
+        with self.lock:
+            self.conn.executemany("INSERT OR IGNORE INTO scanned (rastreio, nf, day) VALUES (?, ?, ?)", rows)
+            self.conn.commit()
+        for code, _, _ in rows:
+            self.bloom.add(code)
+            for listener in self.listeners:
+                listener(code)
+
+    def first_seen(self, code):
+        with self.lock:
+            row = self.conn.execute("SELECT day FROM scanned WHERE rastreio = ?", (code,)).fetchone()
+        return row[0] if row else None
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM scanned").fetchone()[0]
+
+    def close(self):
+        self.save()
+        with self.lock:
+            self.conn.close()
+
+class VideoCatalog:
+    """
+    Descrição: Catálogo persistente (SQLite) dos vídeos de evidência (NF, arquivo, data, tamanho, duração), atualizado de forma incremental a partir da pasta.
+    Description: Persistent (SQLite) catalog of the evidence videos (NF, file, mtime, size, duration), updated incrementally from the folder.
+    """
+    EXTENSIONS = ('.mp4', '.avi')
+    RECENT_SECONDS = 300 # Files this fresh may still be growing without touching the folder mtime
+
+    def __init__(self, video_dir, db_path=None):
+        self.video_dir = video_dir
+        if not os.path.exists(self.video_dir):
+            os.makedirs(self.video_dir)
+        self.db_path = db_path or os.path.join(video_dir, "catalogo.db")
+        self.lock = threading.Lock() # Shared by the Tk thread (pages) and the sync thread
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS videos (
+                filename TEXT PRIMARY KEY,
+                nf TEXT NOT NULL,
+                mtime REAL NOT NULL,
+                size INTEGER NOT NULL,
+                duration REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_videos_mtime ON videos(mtime, filename);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        """)
+        self.conn.commit()
+
+    @staticmethod
+    def nf_for(filename):
+        return nf_from_video_filename(filename) or "Desconhecido"
+
+    @staticmethod
+    def probe_duration(path):
+        """
+        Descrição: Duração do vídeo em segundos (contagem de quadros / FPS), ou -1 se não for legível (ex.: ainda sendo gravado).
+        Description: Video duration in seconds (frame count / FPS), or -1 if unreadable (e.g. still being recorded).
+        """
+        cap = cv2.VideoCapture(path)
+        try:
+            frames = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            if not cap.isOpened() or frames <= 0 or fps <= 0:
+                return -1.0
+            return round(frames / fps, 1)
+        finally:
+            cap.release()
+
+    def _get_meta(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _stat_entries(self, names=None):
+        # scandir hands back the stat for free on Windows and saves a lookup per file elsewhere
+        found = {}
+        if names is None:
+            with os.scandir(self.video_dir) as it:
+                for entry in it:
+                    if entry.name.lower().endswith(self.EXTENSIONS) and entry.is_file():
+                        st = entry.stat()
+                        found[entry.name] = (st.st_mtime, st.st_size)
+        else:
+            for name in names:
+                try:
+                    st = os.stat(os.path.join(self.video_dir, name))
+                except OSError:
+                    continue
+                found[name] = (st.st_mtime, st.st_size)
+        return found
+
+    def sync(self, full=False):
+        """
+        Descrição: Aplica ao catálogo as mudanças da pasta. Se a pasta não mudou, só reexamina os arquivos recentes; full=True reexamina todos (um vídeo regravado por cima do antigo não muda a pasta). Retorna (adicionados, alterados, removidos): listas de (arquivo, nf, mtime) e de nomes removidos.
+        Description: Applies the folder changes to the catalog. If the folder is unchanged, only recent files are re-examined; full=True re-examines every file (a video re-recorded over the old one does not change the folder). Returns (added, changed, removed): lists of (filename, nf, mtime) and of removed names.
+        """
+        dir_mtime = str(os.stat(self.video_dir).st_mtime_ns)
+        with self.lock:
+            full_scan = full or self._get_meta("dir_mtime") != dir_mtime
+            if full_scan:
+                known = dict((f, (m, z)) for f, m, z in self.conn.execute("SELECT filename, mtime, size FROM videos"))
+            else:
+                cutoff = time.time() - self.RECENT_SECONDS
+                known = dict((f, (m, z)) for f, m, z in self.conn.execute(
+                    "SELECT filename, mtime, size FROM videos WHERE mtime >= ?", (cutoff,)))
+
+        found = self._stat_entries(None if full_scan else list(known))
+
+        added = [(f, self.nf_for(f), m, z) for f, (m, z) in found.items() if f not in known]
+        changed = [(m, z, f) for f, (m, z) in found.items() if f in known and known[f] != (m, z)]
+        removed = [(f,) for f in known if f not in found]
+
+        with self.lock:
+            if added:
+                self.conn.executemany("INSERT OR REPLACE INTO videos (filename, nf, mtime, size, duration) VALUES (?, ?, ?, ?, NULL)", added)
+            if changed:
+                # Content changed: the duration has to be probed again
+                self.conn.executemany("UPDATE videos SET mtime = ?, size = ?, duration = NULL WHERE filename = ?", changed)
+            if removed:
+                self.conn.executemany("DELETE FROM videos WHERE filename = ?", removed)
+            if full_scan:
+                self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('dir_mtime', ?)", (dir_mtime,))
+            self.conn.commit()
+        return ([(f, nf, m) for f, nf, m, _ in added],
+                [(f, self.nf_for(f), m) for m, _, f in changed],
+                [f for (f,) in removed])
+
+    def probe_pending(self, limit=50):
+        """
+        Descrição: Mede a duração de até `limit` vídeos ainda sem duração. Retorna [(arquivo, duração)].
+        Description: Measures the duration of up to `limit` videos still without one. Returns [(filename, duration)].
+        """
+        with self.lock:
+            names = [row[0] for row in self.conn.execute(
+                "SELECT filename FROM videos WHERE duration IS NULL ORDER BY mtime DESC LIMIT ?", (limit,))]
+        probed = [(name, self.probe_duration(os.path.join(self.video_dir, name))) for name in names]
+        if probed:
+            with self.lock:
+                self.conn.executemany("UPDATE videos SET duration = ? WHERE filename = ?", [(d, f) for f, d in probed])
+                self.conn.commit()
+        return probed
+
+    def count(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+
+    def entries(self):
+        """
+        Descrição: Todos os vídeos como (arquivo, nf, mtime), para montar o índice de busca.
+        Description: Every video as (filename, nf, mtime), to build the search index.
+        """
+        with self.lock:
+            return self.conn.execute("SELECT filename, nf, mtime FROM videos").fetchall()
+
+    def rows(self, filenames):
+        """
+        Descrição: Linhas completas dos arquivos pedidos, na mesma ordem.
+        Description: Full rows for the requested files, in the same order.
+        """
+        found = {}
+        names = list(filenames)
+        with self.lock:
+            for start in range(0, len(names), 500): # Stay under SQLite's bound-parameter limit
+                chunk = names[start:start + 500]
+                marks = ",".join("?" * len(chunk))
+                for row in self.conn.execute(f"SELECT filename, nf, mtime, size, duration FROM videos WHERE filename IN ({marks})", chunk):
+                    found[row[0]] = row
+        return [found[name] for name in names if name in found]
+
+    def page(self, after=None, limit=200, query=""):
+        """
+        Descrição: Próxima página de vídeos, do mais novo para o mais antigo, continuando após a chave (mtime, arquivo) `after`.
+        Description: Next page of videos, newest first, continuing after the (mtime, filename) key `after`.
+        """
+        sql = "SELECT filename, nf, mtime, size, duration FROM videos"
+        clauses, params = [], []
+        if after is not None:
+            clauses.append("(mtime < ? OR (mtime = ? AND filename < ?))")
+            params += [after[0], after[0], after[1]]
+        query = query.strip().lower()
+        if query:
+            # Same semantics as NFSearchIndex.search, so results don't change once the index is ready
+            pattern = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            if len(query) < NFSearchIndex.GRAM:
+                clauses.append("(LOWER(nf) LIKE ? ESCAPE '\\' OR LTRIM(LOWER(nf), '0') LIKE ? ESCAPE '\\')")
+                params += [f"{pattern}%"] * 2
+            else:
+                clauses.append("(LOWER(nf) LIKE ? ESCAPE '\\' OR LOWER(filename) LIKE ? ESCAPE '\\')")
+                params += [f"%{pattern}%"] * 2
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY mtime DESC, filename DESC LIMIT ?"
+        params.append(limit)
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+class NFSearchIndex:
+    """
+    Descrição: Índice em memória para a busca da galeria: prefixo ordenado de NF (consultas curtas) e índice de trigramas para substring em NF/arquivo.
+    Description: In-memory index for the gallery search: sorted NF prefix index (short queries) and trigram index for substrings of NF/filename.
+    """
+    GRAM = 3
+
+    def __init__(self, entries=()):
+        self.mtimes = {} # filename -> mtime (result order)
+        self.nfs = {} # filename -> nf
+        self.prefixes = [] # sorted (key, filename); key is the NF with and without leading zeros
+        self.grams = {} # trigram -> set of filenames
+        for filename, nf, mtime in entries:
+            self.mtimes[filename] = mtime
+            self.nfs[filename] = nf
+            for key in self._prefix_keys(nf):
+                self.prefixes.append((key, filename))
+            for gram in self._grams_of(filename, nf):
+                self.grams.setdefault(gram, set()).add(filename)
+        self.prefixes.sort()
+
+    def __len__(self):
+        return len(self.mtimes)
+
+    @staticmethod
+    def _prefix_keys(nf):
+        nf = nf.lower()
+        stripped = nf.lstrip("0")
+        return {nf, stripped} if stripped else {nf}
+
+    def _grams_of(self, filename, nf):
+        grams = set()
+        for text in (filename.lower(), nf.lower()):
+            for i in range(len(text) - self.GRAM + 1):
+                grams.add(text[i:i + self.GRAM])
+        return grams
+
+    def add(self, filename, nf, mtime):
+        if filename in self.mtimes:
+            self.remove(filename)
+        self.mtimes[filename] = mtime
+        self.nfs[filename] = nf
+        for key in self._prefix_keys(nf):
+            bisect.insort(self.prefixes, (key, filename))
+        for gram in self._grams_of(filename, nf):
+            self.grams.setdefault(gram, set()).add(filename)
+
+    def remove(self, filename):
+        nf = self.nfs.pop(filename, None)
+        if nf is None:
+            return
+        del self.mtimes[filename]
+        for key in self._prefix_keys(nf):
+            pos = bisect.bisect_left(self.prefixes, (key, filename))
+            if pos < len(self.prefixes) and self.prefixes[pos] == (key, filename):
+                del self.prefixes[pos]
+        for gram in self._grams_of(filename, nf):
+            bucket = self.grams.get(gram)
+            if bucket is not None:
+                bucket.discard(filename)
+                if not bucket:
+                    del self.grams[gram]
+
+    def _matches(self, filename, query):
+        return query in self.nfs[filename].lower() or query in filename.lower()
+
+    def search(self, query, within=None):
+        """
+        Descrição: Arquivos que casam com a consulta, do mais novo para o mais antigo. Consultas com menos de 3 caracteres buscam pelo início da NF; as demais, por substring. `within` restringe a um resultado anterior (refinamento).
+        Description: Files matching the query, newest first. Queries under 3 characters match the NF start; longer ones match any substring. `within` restricts to a previous result (refinement).
+        """
+        query = query.strip().lower()
+        if not query:
+            return []
+        if len(query) < self.GRAM:
+            pos = bisect.bisect_left(self.prefixes, (query, ""))
+            hits = set()
+            while pos < len(self.prefixes) and self.prefixes[pos][0].startswith(query):
+                hits.add(self.prefixes[pos][1])
+                pos += 1
+        elif within is not None:
+            # Typing one more character: the answer is a subset of the previous one
+            hits = {f for f in within if f in self.mtimes and self._matches(f, query)}
+        else:
+            buckets = [self.grams.get(query[i:i + self.GRAM]) for i in range(len(query) - self.GRAM + 1)]
+            if any(b is None for b in buckets):
+                return []
+            buckets.sort(key=len)
+            hits = set(buckets[0])
+            for bucket in buckets[1:]:
+                hits &= bucket
+                if not hits:
+                    break
+            # Trigrams can co-occur without being contiguous: confirm the substring
+            hits = {f for f in hits if self._matches(f, query)}
+        return sorted(hits, key=lambda f: (self.mtimes[f], f), reverse=True)
+
+class ThumbnailCache:
+    """
+    Descrição: Miniaturas (e folhas de contato) dos vídeos de evidência, geradas por um pool de threads e guardadas em disco por arquivo + mtime.
+    Description: Thumbnails (and contact sheets) of the evidence videos, generated by a thread pool and cached on disk by file + mtime.
+    """
+    def __init__(self, video_dir, cache_dir=None, width=120, workers=2):
+        self.video_dir = video_dir
+        self.cache_dir = cache_dir or os.path.join(video_dir, ".miniaturas")
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+        self.width = width
+        # OpenCV releases the GIL while decoding, so threads are enough here
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="thumbnail")
+        self.pending = {} # cache path -> Future
+        self.pending_lock = threading.Lock() # request() runs on the Tk thread, _generate() on the pool
+
+    def path_for(self, filename, mtime, kind="thumb"):
+        # PNG: Tk 8.6 loads it natively, no imaging library needed
+        key = hashlib.sha1(f"{filename}|{mtime!r}|{kind}".encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.png")
+
+    def cached(self, filename, mtime, kind="thumb"):
+        path = self.path_for(filename, mtime, kind)
+        return path if os.path.exists(path) else None
+
+    def request(self, filename, mtime, callback, kind="thumb"):
+        """
+        Descrição: Se a imagem já estiver em disco, chama `callback(arquivo, caminho)` na hora; senão a gera em segundo plano e o callback é chamado na thread do pool (caminho None se falhou).
+        Description: If the image is already on disk, calls `callback(filename, path)` right away; otherwise generates it in the background and the callback runs on the pool thread (path None on failure).
+        """
+        path = self.cached(filename, mtime, kind)
+        if path is not None:
+            callback(filename, path)
+            return
+        path = self.path_for(filename, mtime, kind)
+        make = self._make_thumbnail if kind == "thumb" else self._make_contact_sheet
+        with self.pending_lock:
+            if path in self.pending:
+                return
+            # Submit under the lock: a fast _generate waits on it to pop, so the entry is set first and never left stale
+            self.pending[path] = self.pool.submit(self._generate, make, filename, path, callback)
+
+    def _generate(self, make, filename, path, callback):
+        result = None
+        try:
+            if os.path.exists(path):
+                result = path
+            else:
+                image = make(os.path.join(self.video_dir, filename))
+                if image is not None:
+                    # Write then rename: a half-written PNG must never be picked up as cached
+                    tmp_path = path + ".tmp.png"
+                    cv2.imwrite(tmp_path, image)
+                    os.replace(tmp_path, path)
+                    result = path
+        except Exception as e:
+            print(f"Erro ao gerar miniatura de {filename}: {e}")
+        finally:
+            with self.pending_lock:
+                self.pending.pop(path, None)
+        callback(filename, result)
+
+    def _read_frames(self, video_path, positions):
+        # Seek to each relative position (0..1) and grab one frame
+        cap = cv2.VideoCapture(video_path)
+        frames = []
+        try:
+            count = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+            if not cap.isOpened() or count <= 0:
+                return frames
+            for pos in positions:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, int((count - 1) * pos))
+                ok, frame = cap.read()
+                if ok:
+                    frames.append(frame)
+        finally:
+            cap.release()
+        return frames
+
+    def _resize(self, frame, width):
+        h, w = frame.shape[:2]
+        return cv2.resize(frame, (width, max(1, int(h * width / w))), interpolation=cv2.INTER_AREA)
+
+    def _make_thumbnail(self, video_path):
+        # Middle of the clip: the package is in front of the camera after the hold period
+        frames = self._read_frames(video_path, [0.5])
+        return self._resize(frames[0], self.width) if frames else None
+
+    def _make_contact_sheet(self, video_path, cols=2, rows=2, tile_width=160):
+        frames = self._read_frames(video_path, [(i + 1) / (cols * rows + 1) for i in range(cols * rows)])
+        if not frames:
+            return None
+        tiles = [self._resize(f, tile_width) for f in frames]
+        blank = np.zeros_like(tiles[0])
+        tiles += [blank] * (cols * rows - len(tiles))
+        return np.vstack([np.hstack(tiles[r * cols:(r + 1) * cols]) for r in range(rows)])
+
+    def cancel_pending(self):
+        with self.pending_lock:
+            for future in self.pending.values():
+                future.cancel()
+            self.pending.clear()
+
+    def shutdown(self):
+        self.cancel_pending()
+        self.pool.shutdown(wait=False)
+
+class LRUCache:
+    """
+    Descrição: Cache limitado com expulsão LRU e expiração por TTL, com contadores de acertos/falhas/expulsões.
+    Description: Bounded cache with LRU eviction and TTL expiry, with hit/miss/eviction counters.
+    """
+    def __init__(self, max_size=1024, ttl=600.0, clock=time.time):
+        self.max_size = max_size
+        self.ttl = ttl # Seconds; None disables expiry
+        self.clock = clock
+        self._data = OrderedDict() # key -> (stored_at, value)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key, default=None):
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        stored_at, value = entry
+        if self.ttl is not None and self.clock() - stored_at > self.ttl:
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def peek(self, key, default=None):
+        """
+        Descrição: Lê uma entrada sem mexer na ordem LRU nem nos contadores (entradas vencidas contam como ausentes).
+        Description: Reads an entry without touching the LRU order or the counters (expired entries count as absent).
+        """
+        entry = self._data.get(key)
+        if entry is None or (self.ttl is not None and self.clock() - entry[0] > self.ttl):
+            return default
+        return entry[1]
+
+    def set(self, key, value):
+        self._data[key] = (self.clock(), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def replace(self, key, value):
+        """
+        Descrição: Atualiza o valor de uma entrada existente sem renovar seu TTL.
+        Description: Updates an existing entry's value without renewing its TTL.
+        """
+        entry = self._data.get(key)
+        if entry is not None:
+            self._data[key] = (entry[0], value)
+
+    def invalidate(self, key):
+        if self._data.pop(key, None) is not None:
+            self.invalidations += 1
+
+    def clear(self):
+        self.invalidations += len(self._data)
+        self._data.clear()
+
+    def items(self):
+        return [(key, value) for key, (_, value) in self._data.items()]
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+class FrameSource:
+    """
+    Descrição: Interface de fonte de quadros. read() retorna (sucesso, imagem, timestamp em segundos).
+    Description: Frame source interface. read() returns (success, image, timestamp in seconds).
+    """
+    fps = 30.0
+    live = False # True for sources that produce frames in real time (camera)
+
+    def read(self):
+        return False, None, None
+
+    def release(self):
+        pass
+
+class CameraSource(FrameSource):
+    """
+    Descrição: Webcam via cv2.VideoCapture (timestamps do relógio real).
+    Description: Webcam through cv2.VideoCapture (wall-clock timestamps).
+    """
+    live = True
+
+    def __init__(self, index=0, width=1280, height=720):
+        self.cap = cv2.VideoCapture(index)
+        self.cap.set(3, width) # Width
+        self.cap.set(4, height)  # Height
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+
+    def read(self):
+        success, img = self.cap.read()
+        return success, img, time.time()
+
+    def release(self):
+        self.cap.release()
+
+class VideoFileSource(FrameSource):
+    """
+    Descrição: Arquivo de vídeo gravado. Timestamps derivados do índice do quadro (relógio simulado), com opção de tempo real.
+    Description: Recorded video file. Timestamps derived from the frame index (simulated clock), optionally paced in real time.
+    """
+    def __init__(self, path, start_time=0.0, realtime=False, fps=None):
+        self.path = path
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise ValueError(f"Não foi possível abrir o vídeo: {path}")
+        self.fps = fps or self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.start_time = start_time
+        self.realtime = realtime
+        self.live = realtime
+        self.index = 0
+        self._wall_start = None
+
+    def read(self):
+        success, img = self.cap.read()
+        if not success:
+            return False, None, None
+        timestamp = self.start_time + self.index / self.fps
+        if self.realtime:
+            if self._wall_start is None:
+                self._wall_start = time.time()
+            delay = self._wall_start + self.index / self.fps - time.time()
+            if delay > 0:
+                time.sleep(delay)
+        self.index += 1
+        return True, img, timestamp
+
+    def release(self):
+        self.cap.release()
+
+class ImageDirectorySource(FrameSource):
+    """
+    Descrição: Pasta de imagens (ordem alfabética), reproduzida como vídeo a uma taxa fixa simulada.
+    Description: Image folder (alphabetical order), replayed as a video at a fixed simulated rate.
+    """
+    EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+    def __init__(self, path, fps=20.0, start_time=0.0):
+        self.files = sorted(
+            os.path.join(path, f) for f in os.listdir(path) if f.lower().endswith(self.EXTENSIONS)
+        )
+        self.fps = fps
+        self.start_time = start_time
+        self.index = 0
+
+    def read(self):
+        while self.index < len(self.files):
+            img = cv2.imread(self.files[self.index])
+            timestamp = self.start_time + self.index / self.fps
+            self.index += 1
+            if img is not None:
+                return True, img, timestamp
+        return False, None, None
+
+def open_frame_source(spec, realtime=False):
+    """
+    Descrição: Cria a fonte de quadros a partir de um índice de câmera, arquivo de vídeo ou pasta de imagens.
+    Description: Builds the frame source from a camera index, video file or image folder.
+    """
+    if isinstance(spec, int) or str(spec).isdigit():
+        return CameraSource(int(spec))
+    if os.path.isdir(spec):
+        return ImageDirectorySource(spec)
+    return VideoFileSource(spec, realtime=realtime)
+
+class PerfMonitor:
+    """
+    Descrição: Instrumentação por estágio do loop (histogramas móveis p50/p95/p99 e FPS), com overlay, dump periódico e cProfile.
+    Description: Per-stage loop instrumentation (rolling p50/p95/p99 histograms and FPS), with overlay, periodic dump and cProfile.
+    """
+    def __init__(self, window=600, dump_path=None, dump_interval=60.0, profile_frames=300, profile_dir="."):
+        self.window = window
+        self.samples = {} # stage -> deque of ms
+        self.frame_times = deque(maxlen=window)
+        self.show_overlay = False
+        self.dump_path = dump_path # JSON lines file, None disables the dump
+        self.dump_interval = dump_interval
+        self.profile_frames = profile_frames
+        self.profile_dir = profile_dir
+        self.profiler = None
+        self._profile_left = 0
+        self._thread_profilers = {} # worker thread name -> (cProfile.Profile, lock held while it is enabled)
+        self._thread_profiling = True # False if the interpreter refuses a second profiler
+        self._last_dump = time.time()
+        self._lap = None
+        self._overlay_summary = None # Summary shown on screen, refreshed twice per second
+        self._overlay_refreshed = 0.0
+
+    def record(self, stage, ms):
+        samples = self.samples.get(stage)
+        if samples is None:
+            samples = self.samples.setdefault(stage, deque(maxlen=self.window))
+        samples.append(ms)
+
+    def begin_frame(self):
+        self._lap = time.perf_counter()
+
+    def lap(self, stage):
+        """
+        Descrição: Registra o tempo desde a última marcação no estágio informado.
+        Description: Records the time since the previous mark under the given stage.
+        """
+        now = time.perf_counter()
+        self.record(stage, (now - self._lap) * 1000.0)
+        self._lap = now
+
+    def end_frame(self, frame_time):
+        self.frame_times.append(frame_time)
+        if self.profiler is not None:
+            self._profile_left -= 1
+            if self._profile_left <= 0:
+                self._finish_profile()
+        if self.dump_path and time.time() - self._last_dump >= self.dump_interval:
+            self.dump()
+
+    def fps(self):
+        if len(self.frame_times) < 2:
+            return 0.0
+        span = self.frame_times[-1] - self.frame_times[0]
+        return (len(self.frame_times) - 1) / span if span > 0 else 0.0
+
+    def summary(self):
+        """
+        Descrição: Retorna p50/p95/p99 (ms) de cada estágio e o FPS atual.
+        Description: Returns p50/p95/p99 (ms) for every stage and the current FPS.
+        """
+        stages = {}
+        for stage, samples in list(self.samples.items()):
+            if not samples:
+                continue
+            values = np.array(samples)
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            stages[stage] = {"p50_ms": round(float(p50), 2), "p95_ms": round(float(p95), 2), "p99_ms": round(float(p99), 2)}
+        return {"fps": round(self.fps(), 2), "stages": stages}
+
+    def draw(self, img, extra_lines=None):
+        now = time.perf_counter()
+        if self._overlay_summary is None or now - self._overlay_refreshed > 0.5:
+            self._overlay_summary = self.summary()
+            self._overlay_refreshed = now
+        summary = self._overlay_summary
+        lines = [f"FPS: {summary['fps']:.1f}" + ("  [PROFILING]" if self.profiler is not None else "")]
+        for stage, stats in summary["stages"].items():
+            lines.append(f"{stage:<10} p50 {stats['p50_ms']:6.1f}  p95 {stats['p95_ms']:6.1f}  p99 {stats['p99_ms']:6.1f} ms")
+        lines.extend(extra_lines or [])
+
+        x, y = img.shape[1] - 560, 120
+        panel = img[y - 25:y + 22 * len(lines), x - 10:img.shape[1] - 10]
+        panel[:] = cv2.convertScaleAbs(panel, alpha=0.35) # Darken behind the text
+        for i, line in enumerate(lines):
+            cv2.putText(img, line, (x, y + 22 * i), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+
+    def dump(self):
+        """
+        Descrição: Acrescenta um snapshot das métricas (JSON por linha) ao arquivo de métricas.
+        Description: Appends a metrics snapshot (one JSON per line) to the metrics file.
+        """
+        self._last_dump = time.time()
+        if not self.dump_path:
+            return
+        try:
+            entry = {"timestamp": datetime.datetime.now().isoformat(timespec="seconds")}
+            entry.update(self.summary())
+            with open(self.dump_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+        except Exception as e:
+            print(f"Erro ao gravar métricas: {e}")
+
+    def start_profile(self):
+        """
+        Descrição: Inicia uma captura cProfile dos próximos N quadros do loop principal; as threads de trabalho entram via thread_profile().
+        Description: Starts a cProfile capture of the next N frames of the main loop; worker threads join in through thread_profile().
+        """
+        if self.profiler is not None:
+            return
+        print(f"Perfilando os próximos {self.profile_frames} quadros...")
+        self.profiler = cProfile.Profile()
+        self._profile_left = self.profile_frames
+        self.profiler.enable()
+
+    @contextlib.contextmanager
+    def thread_profile(self):
+        """
+        Descrição: Envolve uma iteração de uma thread de trabalho (captura, decodificação, gravador) com o profiler próprio dessa thread enquanto houver captura cProfile.
+        Description: Wraps one iteration of a worker thread (capture, decode, recorder) in that thread's own profiler while a cProfile capture is running.
+        """
+        if self.profiler is None or not self._thread_profiling:
+            yield
+            return
+        name = threading.current_thread().name
+        entry = self._thread_profilers.get(name)
+        if entry is None:
+            entry = self._thread_profilers.setdefault(name, (cProfile.Profile(), threading.Lock()))
+        profiler, lock = entry
+        with lock:
+            try:
+                profiler.enable()
+            except ValueError:
+                # Python 3.12+: a single process-wide profiler already sees every thread
+                self._thread_profiling = False
+                yield
+                return
+            try:
+                yield
+            finally:
+                profiler.disable()
+
+    def _finish_profile(self):
+        self.profiler.disable()
+        main_profiler, self.profiler = self.profiler, None # Workers stop enabling theirs from here on
+        workers, self._thread_profilers = self._thread_profilers, {}
+        path = os.path.join(self.profile_dir, f"perfil_{datetime.datetime.now().strftime('%Y-%m-%d_%H%M%S')}.prof")
+        try:
+            stats = pstats.Stats(main_profiler)
+            for name, (profiler, lock) in workers.items():
+                # Wait for the worker to finish its current iteration
+                if not lock.acquire(timeout=2.0):
+                    print(f"Aviso: perfil da thread {name} ignorado (ocupada).")
+                    continue
+                try:
+                    stats.add(profiler)
+                except Exception as e:
+                    print(f"Aviso: perfil da thread {name} ignorado ({e}).")
+                finally:
+                    lock.release()
+            stats.dump_stats(path)
+            out = io.StringIO()
+            stats.stream = out
+            stats.sort_stats("cumulative").print_stats(20)
+            print(out.getvalue())
+            threads = ", ".join(["principal"] + sorted(workers))
+            print(f"Perfil gravado em {path} (threads: {threads})")
+        except Exception as e:
+            print(f"Erro ao gravar perfil: {e}")
+
+GovernorLevel = namedtuple("GovernorLevel", ["name", "decode_every", "decode_scale", "light_overlay"])
+
+# From full quality to the lightest load the scanner still works at
+GOVERNOR_LEVELS = [
+    GovernorLevel("normal", 1, 1.0, False),
+    GovernorLevel("decodifica 1/2", 2, 1.0, False),
+    GovernorLevel("decodifica 1/2 a 75%", 2, 0.75, False),
+    GovernorLevel("decodifica 1/3 a 50%", 3, 0.5, True),
+]
+
+class FrameBudgetGovernor:
+    """
+    Descrição: Compara o custo de cada iteração do loop com um orçamento por quadro e troca de nível (taxa e resolução da decodificação, overlay) com histerese.
+    Description: Compares each loop iteration's cost against a per-frame budget and switches level (decode rate and resolution, overlay) with hysteresis.
+    """
+    def __init__(self, target_fps=20.0, levels=GOVERNOR_LEVELS, smoothing=0.1, high_water=1.0, low_water=0.6,
+                 degrade_after=10, recover_after=60, cooldown=30):
+        self.budget_ms = 1000.0 / target_fps
+        self.levels = levels
+        self.smoothing = smoothing # EMA weight of the newest sample
+        self.high_water = high_water # Load (cost / budget) above which work is shed
+        self.low_water = low_water # Load below which work is restored
+        self.degrade_after = degrade_after # Consecutive overloaded iterations before stepping down
+        self.recover_after = recover_after # Consecutive light iterations before stepping back up
+        self.cooldown = cooldown # Iterations ignored after a change, while the averages settle
+        self.index = 0
+        self.frame_ms = 0.0 # EMA of the main loop work per frame
+        self.decode_ms = 0.0 # EMA of one decode call
+        self.changes = 0
+        self.decisions = deque(maxlen=50) # (timestamp, from, to, load)
+        self._over = 0
+        self._under = 0
+        self._settle = 0
+        self._ticks = 0
+        self._offered = 0 # Frames handed to the decode stage since the last decode
+        self._recovered_at = None
+        self._recover_needed = recover_after # Doubles when a recovery is undone right away (no flapping)
+
+    @property
+    def level(self):
+        return self.levels[self.index]
+
+    @property
+    def load(self):
+        # Decode cost is spread over the frames each decode covers
+        return max(self.frame_ms, self.decode_ms / self.level.decode_every) / self.budget_ms
+
+    def _average(self, current, sample):
+        return sample if current == 0.0 else current + self.smoothing * (sample - current)
+
+    def should_decode(self):
+        """
+        Descrição: Conta os quadros entregues ao estágio de decodificação e libera um a cada decode_every. Não usa o id do quadro: a fila da thread de decodificação já pula quadros.
+        Description: Counts the frames handed to the decode stage and lets one in every decode_every through. Frame ids are not used: the decode thread's queue already skips frames.
+        """
+        self._offered += 1
+        if self._offered >= self.level.decode_every:
+            self._offered = 0
+            return True
+        return False
+
+    def observe_decode(self, ms):
+        # Called from the decode stage (its own thread when the pipeline is threaded)
+        self.decode_ms = self._average(self.decode_ms, ms)
+
+    def observe_frame(self, ms, timestamp=None):
+        """
+        Descrição: Registra o custo de uma iteração do loop e, se for o caso, troca de nível. Retorna o novo nível, ou None se nada mudou.
+        Description: Records one loop iteration's cost and, if needed, switches level. Returns the new level, or None if nothing changed.
+        """
+        self._ticks += 1
+        self.frame_ms = self._average(self.frame_ms, ms)
+        if self._settle > 0:
+            self._settle -= 1
+            return None
+        load = self.load
+        self._over = self._over + 1 if load > self.high_water else 0
+        self._under = self._under + 1 if load < self.low_water else 0
+        if self._over >= self.degrade_after and self.index < len(self.levels) - 1:
+            if self._recovered_at is not None and self._ticks - self._recovered_at < 2 * self._recover_needed:
+                self._recover_needed = min(self._recover_needed * 2, 16 * self.recover_after)
+            return self._change(self.index + 1, load, timestamp)
+        if self._under >= self._recover_needed and self.index > 0:
+            self._recovered_at = self._ticks
+            return self._change(self.index - 1, load, timestamp)
+        return None
+
+    def _change(self, index, load, timestamp):
+        previous = self.level
+        self.index = index
+        self._over = self._under = 0
+        self._settle = self.cooldown
+        self.changes += 1
+        self.decisions.append((timestamp, previous.name, self.level.name, round(load, 2)))
+        action = "aliviando" if index > self.levels.index(previous) else "restaurando"
+        print(f"Governador ({action}): {previous.name} -> {self.level.name} "
+              f"(custo {load * self.budget_ms:.1f} ms, orçamento {self.budget_ms:.1f} ms)")
+        return self.level
+
+    def status_text(self):
+        return f"carga: {self.level.name} ({self.load * 100:.0f}% do orcamento)"
+
+    def stats(self):
+        return {
+            "level": self.level.name,
+            "budget_ms": round(self.budget_ms, 2),
+            "frame_ms": round(self.frame_ms, 2),
+            "decode_ms": round(self.decode_ms, 2),
+            "changes": self.changes,
+            "decisions": list(self.decisions),
+        }
+
+class ScanStation:
+    """
+    Descrição: Estado compartilhado por todas as câmeras de uma estação: planilha indexada, índice de duplicatas e um único gravador serializado de log/evidências.
+    Description: State shared by every camera of a station: indexed spreadsheet, duplicate index and a single serialized log/evidence writer.
+    """
+    def __init__(self, data_loader, report_path="."):
+        self.data_loader = data_loader
+        self.report_dir = report_path
+        if not os.path.exists(self.report_dir):
+            os.makedirs(self.report_dir)
+
+        self.log_day = datetime.datetime.now().strftime('%Y-%m-%d')
+        self.log_file = os.path.join(self.report_dir, f"conferencia_log_{self.log_day}.csv")
+        self.log_lock = threading.Lock() # CSV mirror is written by the writer thread and at export
+
+        # --- LOGGING SETUP ---
+        if not os.path.exists(self.log_file):
+            with open(self.log_file, "w", encoding='utf-8') as f:
+                f.write("Timestamp,Rastreio,Status,Mensagem,Video_Evidence\n")
+        else:
+             with open(self.log_file, 'r', encoding='utf-8') as f:
+                 header = f.readline()
+             if "Video_Evidence" not in header:
+                 df_log = pd.read_csv(self.log_file)
+                 df_log["Video_Evidence"] = ""
+                 df_log.to_csv(self.log_file, index=False)
+
+        # Indexed store is the source of truth; the CSV is kept as an append-only mirror + export
+        self.log_store = ScanLogStore(os.path.join(self.report_dir, "conferencia_log.db"))
+        imported = self.log_store.import_csv(self.log_file, self.log_day)
+        if imported:
+            print(f"Log CSV importado para o banco: {imported} registros.")
+
+        # Cross-day duplicate index (persistent)
+        self.scanned_items = DuplicateIndex(os.path.join(self.report_dir, "conferidos.db"))
+        self.load_scanned_items()
+
+        # Spreadsheet hot-reload (mtime polling on a background thread)
+        self._watch_thread = None
+        self._watch_stop = threading.Event()
+
+        # Single writer thread: log rows and video attachments from every camera, in order
+        self._writes = queue.Queue()
+        self._writer_thread = threading.Thread(target=self._writer_loop, name="station-writer", daemon=True)
+        self._writer_thread.start()
+
+    def load_scanned_items(self):
+        """
+        Descrição: Sincroniza o índice de duplicatas com o log de hoje e, na primeira execução, com os logs CSV antigos.
+        Description: Syncs the duplicate index with today's log and, on first run, with the old CSV logs.
+        """
+        try:
+            if len(self.scanned_items) == 0:
+                # First run: seed the history from every previous daily CSV
+                for path in sorted(glob.glob(os.path.join(self.report_dir, "conferencia_log_*.csv"))):
+                    day = os.path.basename(path)[len("conferencia_log_"):-len(".csv")]
+                    try:
+                        df = pd.read_csv(path, dtype=str)
+                    except Exception as e:
+                        print(f"Aviso: log '{path}' ignorado ({e}).")
+                        continue
+                    if not df.empty and "Status" in df.columns and "Rastreio" in df.columns:
+                        codes = df[df["Status"] == "SUCESSO"]["Rastreio"].astype(str).str.strip()
+                        self.scanned_items.update(set(codes), day=day)
+
+            self.scanned_items.update(self.log_store.successful_codes(self.log_day), day=self.log_day)
+            self.scanned_items.save()
+            print(f"Log carregado. {len(self.scanned_items)} itens já conferidos no histórico.")
+        except Exception as e:
+            print(f"Erro ao carregar log de duplicatas: {e}")
+
+    def log_scan(self, tracking, status, message, nf=None):
+        """
+        Descrição: Registra uma operação de escaneamento. O índice de duplicatas é atualizado na hora; banco e CSV pela thread de escrita.
+        Description: Logs a scan operation. The duplicate index is updated immediately; store and CSV by the writer thread.
+        """
+        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        if status == "SUCESSO":
+            # Synchronous so every bench sees the duplicate on its next frame
+            try:
+                self.scanned_items.add(tracking, nf=nf, day=self.log_day)
+            except Exception as e:
+                print(f"Erro ao atualizar índice de duplicatas: {e}")
+        self._writes.put(("scan", (timestamp, tracking, status, message, nf)))
+
+    def attach_video(self, nf, video_filename):
+        """
+        Descrição: Enfileira a associação do vídeo de evidência aos registros SUCESSO da NF.
+        Description: Queues the attachment of the evidence video to the NF's SUCESSO rows.
+        """
+        if nf:
+            self._writes.put(("video", (nf, video_filename)))
+
+    def _writer_loop(self):
+        while True:
+            item = self._writes.get()
+            if item is None:
+                # Sentinel from close(): everything queued before it is already written
+                self._writes.task_done()
+                break
+            kind, payload = item
+            try:
+                if kind == "scan":
+                    timestamp, tracking, status, message, nf = payload
+                    try:
+                        self.log_store.add_scan(timestamp, tracking, status, message, nf=nf)
+                    except Exception as e:
+                        print(f"Erro ao gravar log no banco: {e}")
+                    with self.log_lock:
+                        with open(self.log_file, "a", encoding='utf-8') as f:
+                            f.write(f"{timestamp},{tracking},{status},{message},\n")
+                elif kind == "video":
+                    nf, video_filename = payload
+                    try:
+                        self.log_store.attach_video(nf, video_filename, self.log_day)
+                    except Exception as e:
+                        print(f"Erro ao atualizar log com vídeo: {e}")
+            except Exception as e:
+                print(f"Erro na thread de escrita do log: {e}")
+            finally:
+                self._writes.task_done()
+
+    def start_watching(self, interval=2.0):
+        """
+        Descrição: Passa a vigiar o arquivo da planilha e recarrega as linhas alteradas em segundo plano, sem pausar a leitura.
+        Description: Starts watching the spreadsheet file and reloads the changed rows in the background, without pausing scanning.
+        """
+        if self.data_loader.filepath is None or (self._watch_thread is not None and self._watch_thread.is_alive()):
+            return
+        self._watch_stop.clear()
+        self._watch_thread = threading.Thread(target=self._watch_loop, args=(interval,), name="spreadsheet-watch", daemon=True)
+        self._watch_thread.start()
+
+    def stop_watching(self):
+        self._watch_stop.set()
+        if self._watch_thread is not None:
+            self._watch_thread.join(timeout=5.0)
+            self._watch_thread = None
+
+    def _watch_loop(self, interval):
+        pending = None # File state seen on the previous poll, reloaded once it stops changing
+        failed = None # File state that could not be parsed, not retried until it changes
+        while not self._watch_stop.wait(interval):
+            try:
+                if not self.data_loader.changed_on_disk():
+                    pending = None
+                    continue
+                state = self.data_loader._stat_file()
+                if state != pending:
+                    # The ERP may still be writing the export: wait for one quiet interval
+                    pending = state
+                    continue
+                if state == failed:
+                    continue
+                if self.data_loader.reload_changes() is None:
+                    failed = state
+            except Exception as e:
+                print(f"Erro ao verificar planilha: {e}")
+
+    def flush(self):
+        """
+        Descrição: Aguarda a thread de escrita gravar tudo o que está pendente.
+        Description: Waits for the writer thread to persist everything pending.
+        """
+        self._writes.join()
+
+    def export_log_csv(self):
+        """
+        Descrição: Regrava o CSV do dia a partir do banco, incluindo a coluna Video_Evidence.
+        Description: Rewrites the day's CSV from the store, including the Video_Evidence column.
+        """
+        self.flush()
+        try:
+            with self.log_lock:
+                self.log_store.export_csv(self.log_file, self.log_day)
+        except Exception as e:
+            print(f"Erro ao exportar log CSV: {e}")
+
+    def finish(self):
+        """
+        Descrição: Fim de sessão: grava pendências, exporta o CSV e persiste o índice de duplicatas.
+        Description: End of session: flushes pending writes, exports the CSV and persists the duplicate index.
+        """
+        self.export_log_csv()
+        self.scanned_items.save()
+
+    def close(self):
+        """
+        Descrição: Encerra a estação: para o vigia da planilha e a thread de escrita (depois das pendências) e fecha os bancos.
+        Description: Shuts the station down: stops the spreadsheet watcher and the writer thread (after pending writes) and closes the stores.
+        """
+        self.stop_watching()
+        if self._writer_thread is not None:
+            self._writes.put(None)
+            self._writer_thread.join(timeout=10.0)
+            self._writer_thread = None
+        try:
+            self.log_store.close()
+            self.scanned_items.close()
+        except Exception as e:
+            print(f"Erro ao fechar os bancos da estação: {e}")
+
+class BarcodeScanner:
+    def __init__(self, data_loader, video_path="videos_auditoria", report_path=".", use_threads=True,
+                 decoder_backend="pyzbar", decoder_cascade=False, source=None, replay=False,
+                 station=None, camera_id=None, recording_profile="padrao", target_fps=20.0,
+                 preroll_seconds=3.0, preroll_max_mb=48):
+        self.source = source if source is not None else CameraSource(0)
+        self.frame_size = (1280, 720) # Updated from the first captured frame
+        self.camera_id = camera_id # None for a single-camera station
+
+        # Replay mode: no window, single thread, as fast as possible, clock driven by frame timestamps
+        self.replay = replay
+        self.headless = replay
+        if replay:
+            use_threads = False
+        self.last_frame_time = 0.0
+        self.clock = (lambda: self.last_frame_time) if replay else time.time
+        self.run_stats = {}
+
+        self.data_loader = data_loader
+        self.last_scan_time = LRUCache(max_size=1024, ttl=600.0, clock=lambda: self.clock()) # For debounce UI logic
+        
+        # --- PATH CONFIGURATION ---
+        self.report_dir = report_path
+        if not os.path.exists(self.report_dir):
+            os.makedirs(self.report_dir)
+            
+        self.video_dir = video_path
+        if not os.path.exists(self.video_dir):
+            os.makedirs(self.video_dir)
+
+        self.font = cv2.FONT_HERSHEY_SIMPLEX
+        self.window_name = "Conferencia Gueddai" if camera_id is None else f"Conferencia Gueddai - Bancada {camera_id + 1}"
+
+        # --- SHARED STATION STATE (log, duplicate index) ---
+        # A multi-camera station passes one shared instance to every scanner
+        self.owns_station = station is None
+        self.replay_station_dir = None
+        self.replay_log_file = None
+        if station is None and replay:
+            # Replay gets a throwaway station: replayed codes must never reach the real cross-day history
+            self.replay_station_dir = tempfile.mkdtemp(prefix="replay_estacao_")
+            station = ScanStation(data_loader, self.replay_station_dir)
+        self.station = station if station is not None else ScanStation(data_loader, report_path)
+        self.log_day = self.station.log_day
+        self.log_file = self.station.log_file
+        self.log_store = self.station.log_store
+        self.scanned_items = self.station.scanned_items
+
+        self.scan_results_cache = LRUCache(max_size=1024, ttl=600.0, clock=lambda: self.clock()) # code -> (status_text, header_color, rect_color, NF)
+        self._cache_data_version = self.data_loader.version
+        self.scanned_items.listeners.append(self._on_code_scanned)
+        
+        # --- NAVIGATION STATE ---
+        self.nav_action = None # 'home', 'gallery', or None (quit)
+        self.buttons = []
+
+        # --- RECORDING SETUP ---
+        self.is_recording = False
+        if isinstance(recording_profile, RecordingProfile):
+            self.recording_profile = recording_profile
+        else:
+            self.recording_profile = RECORDING_PROFILES[recording_profile]
+        self.preroll_seconds = preroll_seconds # Seconds kept before the trigger (covers the hold period), 0 disables
+        self.preroll_max_mb = preroll_max_mb # Memory budget for the compressed pre-roll
+        preroll = None
+        if self.preroll_seconds > 0:
+            preroll = PreRollBuffer(self.preroll_seconds, self.preroll_max_mb * 1024 * 1024)
+        # --- PERFORMANCE INSTRUMENTATION ---
+        metrics_suffix = "" if camera_id is None else f"_bancada{camera_id + 1}"
+        self.perf = PerfMonitor(
+            dump_path=os.path.join(self.report_dir, f"metricas_{self.log_day}{metrics_suffix}.jsonl"),
+            profile_dir=self.report_dir,
+        )
+        self.recorder = AsyncVideoRecorder(preroll=preroll, blocking=replay, perf=self.perf)
+        
+        # Active Recording State
+        self.current_recording_nf = None 
+        self.last_nf_seen_time = 0
+        self.post_scan_buffer = 3.0 # Segundos para gravar após a NF sair da tela
+        self.current_video_filename = None
+        
+        # Stability Check State
+        self.current_candidate_nf = None
+        self.candidate_start_time = 0
+        self.stability_duration = 2.0 # Seconds to hold before recording starts
+
+        # --- PIPELINE (capture / decode / display) ---
+        self.use_threads = use_threads
+        self.pipeline_stop = threading.Event()
+        self.frame_counter = 0
+        self.rejected_reads = 0 # Decodes dropped by the format pre-filter
+        self.capture_failed = False
+        self.capture_thread = None
+        self.decode_thread = None
+        self.display_queue = None
+        self.decode_queue = None
+        self.result_queue = None
+
+        # --- DECODER (backend + motion / ROI gate) ---
+        self.decoder = make_decoder(decoder_backend, decoder_cascade)
+        self.decode_gate = DecodeGate()
+
+        # --- FRAME BUDGET GOVERNOR (off in replay: audits must not depend on machine speed) ---
+        self.governor = FrameBudgetGovernor(target_fps) if target_fps and not replay else None
+
+    def load_scanned_items(self):
+        """
+        Descrição: Recarrega o índice de duplicatas a partir dos logs (delegado à estação).
+        Description: Reloads the duplicate index from the logs (delegated to the station).
+        """
+        self.station.load_scanned_items()
+
+    def log_scan(self, tracking, status, message, nf=None):
+        """
+        Descrição: Registra uma operação de escaneamento no banco indexado e no CSV do dia (via estação).
+        Description: Logs a scan operation to the indexed store and to the day's CSV (through the station).
+        """
+        self.station.log_scan(tracking, status, message, nf=nf)
+
+    def _on_code_scanned(self, code):
+        """
+        Descrição: Chamado quando um rastreio entra no índice de duplicatas; atualiza a entrada em cache para o status de duplicado.
+        Description: Called when a tracking code enters the duplicate index; switches its cached entry to the duplicate status.
+        """
+        cached = self.scan_results_cache.peek(code)
+        if cached is None:
+            return
+        status_text, header_color, rect_color, found_nf = cached
+        if found_nf and ("Segure" in status_text or "OK:" in status_text):
+            self.scan_results_cache.replace(code, ("ALERTA: Pedido JA Conferido!", (0, 255, 255), (0, 255, 255), found_nf))
+
+    def _update_log_with_video(self, nf, video_filename):
+        """
+        Descrição: Associa o nome do arquivo de vídeo aos registros SUCESSO de uma NF específica (update indexado).
+        Description: Attaches the video filename to the SUCESSO rows of a specific NF (indexed update).
+        """
+        self.station.attach_video(nf, video_filename)
+
+    def export_log_csv(self):
+        """
+        Descrição: Regrava o CSV do dia a partir do banco, incluindo a coluna Video_Evidence.
+        Description: Rewrites the day's CSV from the store, including the Video_Evidence column.
+        """
+        self.station.export_log_csv()
+
+    def start_recording(self, nf):
+        """
+        Descrição: Inicia a gravação de vídeo para uma Nota Fiscal.
+        Description: Starts video recording for a Invoice (NF).
+        """
+        if self.is_recording:
+            self.stop_recording()
+
+        print(f"Iniciando Gravação para NF: {nf}")
+        self.is_recording = True
+        self.current_recording_nf = nf
+        
+        # Format: NF{NUMBER}.mp4 as requested
+        self.current_video_filename = f"NF{nf}.mp4"
+        filepath = os.path.join(self.video_dir, self.current_video_filename)
+        
+        self.recorder.open(filepath, self.recording_profile, self.frame_size)
+
+    def stop_recording(self):
+        """
+        Descrição: Para a gravação atual e finaliza o arquivo de vídeo.
+        Description: Stops the current recording and finalizes the video file.
+        """
+        if self.is_recording:
+            print(f"Parando Gravação de {self.current_recording_nf}...")
+
+            # Finalize the file and patch the log on the recorder thread, off the UI loop
+            nf = self.current_recording_nf
+            video_filename = self.current_video_filename
+            on_finalized = None
+            if nf:
+                on_finalized = lambda: self._update_log_with_video(nf, video_filename)
+            self.recorder.close(on_finalized)
+
+            self.is_recording = False
+            self.current_recording_nf = None
+            self.current_video_filename = None
+
+    def _mouse_callback(self, event, x, y, flags, param):
+        if event == cv2.EVENT_LBUTTONDOWN:
+            for btn in self.buttons:
+                if btn.is_clicked(x, y):
+                    if btn.text == "HOME":
+                         self.nav_action = "home"
+                    elif btn.text == "VIDEOS":
+                         self.nav_action = "gallery"
+
+    def _start_pipeline(self):
+        """
+        Descrição: Inicia as threads de captura e decodificação, ligadas por filas limitadas (descarta o mais antigo).
+        Description: Starts the capture and decode threads, linked by bounded drop-oldest queues.
+        """
+        self.pipeline_stop.clear()
+        if self.decode_gate is not None:
+            self.decode_gate.reset()
+        self.display_queue = DropOldestQueue(maxsize=2)
+        self.decode_queue = DropOldestQueue(maxsize=1) # Decoder always works on the freshest frame
+        self.result_queue = DropOldestQueue(maxsize=16)
+        self.capture_failed = False
+
+        if not self.use_threads:
+            return
+
+        self.capture_thread = threading.Thread(target=self._capture_loop, name="scanner-capture", daemon=True)
+        self.decode_thread = threading.Thread(target=self._decode_loop, name="scanner-decode", daemon=True)
+        self.capture_thread.start()
+        self.decode_thread.start()
+
+    def _stop_pipeline(self):
+        """
+        Descrição: Sinaliza e aguarda o término das threads do pipeline.
+        Description: Signals and waits for the pipeline threads to finish.
+        """
+        self.pipeline_stop.set()
+        for q in (self.display_queue, self.decode_queue, self.result_queue):
+            if q is not None:
+                q.close()
+        for t in (self.capture_thread, self.decode_thread):
+            if t is not None and t.is_alive():
+                t.join(timeout=2.0)
+        self.capture_thread = None
+        self.decode_thread = None
+
+    def _read_frame(self):
+        """
+        Descrição: Lê um quadro da fonte e retorna (id, timestamp, imagem), ou None em caso de falha/fim.
+        Description: Reads a frame from the source and returns (id, timestamp, image), or None on failure/end.
+        """
+        success, img, timestamp = self.source.read()
+        if not success:
+            return None
+        self.frame_counter += 1
+        self.frame_size = (img.shape[1], img.shape[0])
+        return (self.frame_counter, timestamp, img)
+
+    def _capture_loop(self):
+        # Capture stage: runs at camera rate and feeds both the display and the decoder
+        try:
+            while not self.pipeline_stop.is_set():
+                with self.perf.thread_profile():
+                    packet = self._read_frame()
+                    if packet is None:
+                        break
+                    frame_id, timestamp, img = packet
+                    # The decoder gets its own copy, the display stage draws on the original
+                    self.decode_queue.put((frame_id, timestamp, img.copy()))
+                    self.display_queue.put(packet)
+        except Exception as e:
+            print(f"Erro na captura: {e}")
+        finally:
+            # Always release the display stage, even if the source raised
+            self.capture_failed = True
+            self.display_queue.close()
+
+    def _decode_loop(self):
+        # Decode stage: runs at whatever rate zbar sustains, always on the newest frame
+        while not self.pipeline_stop.is_set():
+            packet = self.decode_queue.get(timeout=0.1)
+            if packet is None:
+                if self.decode_queue.closed:
+                    break
+                continue
+            frame_id, timestamp, img = packet
+            if self.governor is not None and not self.governor.should_decode():
+                continue
+            start = time.perf_counter()
+            with self.perf.thread_profile():
+                decoded_objects = self._decode_frame(img)
+            self.perf.record("decode", (time.perf_counter() - start) * 1000.0)
+            self.result_queue.put((frame_id, timestamp, decoded_objects))
+
+    def _decode_frame(self, img):
+        """
+        Descrição: Decodifica os QR Codes presentes no quadro (passando pelo filtro de movimento/ROI, se ativo).
+        Description: Decodes the QR Codes present in the frame (through the motion/ROI gate, if enabled).
+        """
+        start = time.perf_counter()
+        decode_fn = self.decoder.decode
+        if self.governor is not None and self.governor.level.decode_scale < 1.0:
+            scale = self.governor.level.decode_scale
+            decode_fn = lambda image: self._decode_scaled(image, scale)
+        if self.decode_gate is not None:
+            objects = self.decode_gate.decode(img, decode_fn)
+        else:
+            objects = decode_fn(img)
+        if self.governor is not None:
+            self.governor.observe_decode((time.perf_counter() - start) * 1000.0)
+        return objects
+
+    def _decode_scaled(self, img, scale):
+        # Governor under load: decode a reduced copy and map the polygons back to full size
+        small = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        return CascadeDecoder._scale(self.decoder.decode(small), 1.0 / scale)
+
+    def _next_frame(self, timeout=0.5):
         """
-        Descrição: Carrega itens já conferidos (Status=SUCESSO) do log de hoje para evitar duplicatas.
-        Description: Loads already checked items (Status=SUCESSO) from today's log to prevent duplicates.
+        Descrição: Retorna o próximo quadro para exibição/gravação, "idle" se nenhum chegou no prazo, ou None se a captura terminou.
+        Description: Returns the next frame for display/recording, "idle" if none arrived within the timeout, or None if capture has ended.
         """
-        if not os.path.exists(self.log_file):
-            return
+        if not self.use_threads:
+            return self._read_frame()
 
-        try:
-            df = pd.read_csv(self.log_file)
-            # Filter for SUCESSO
-            if not df.empty and "Status" in df.columns and "Rastreio" in df.columns:
-                 success_rows = df[df["Status"] == "SUCESSO"]
-                 for code in success_rows["Rastreio"].astype(str):
-                     self.scanned_items.add(code.strip())
-            print(f"Log carregado. {len(self.scanned_items)} itens já conferidos.")
-        except Exception as e:
-            print(f"Erro ao carregar log de duplicatas: {e}")
+        if self.pipeline_stop.is_set():
+            return None
+        packet = self.display_queue.get(timeout=timeout)
+        if packet is not None:
+            return packet
+        if self.capture_failed or self.display_queue.closed:
+            return None
+        return "idle"
 
-    def log_scan(self, tracking, status, message):
+    def _pending_detections(self, packet):
         """
-        Descrição: Registra uma operação de escaneamento no arquivo de log CSV.
-        Description: Logs a scan operation to the CSV log file.
+        Descrição: Retorna, em ordem, os resultados de decodificação ainda não processados.
+        Description: Returns, in order, the decode results not yet processed.
         """
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        with open(self.log_file, "a", encoding='utf-8') as f:
-            f.write(f"{timestamp},{tracking},{status},{message},\n")
+        if not self.use_threads:
+            frame_id, timestamp, img = packet
+            if self.governor is not None and not self.governor.should_decode():
+                return []
+            return [(frame_id, timestamp, self._decode_frame(img))]
 
-    def _update_log_with_video(self, nf, video_filename):
+        results = []
+        while True:
+            result = self.result_queue.get(timeout=0)
+            if result is None:
+                break
+            results.append(result)
+        return results
+
+    def _default_overlay(self):
+        return {
+            "header_text": "Aguardando Nota...",
+            "header_color": (255, 255, 255),
+            "polygons": [], # [(polygon, color)]
+            "hold_text": None,
+        }
+
+    def _process_detections(self, decoded_objects, current_time):
         """
-        Descrição: Atualiza o log CSV para adicionar o nome do arquivo de vídeo para uma NF específica.
-        Description: Updates the CSV log to add the video filename for a specific NF.
+        Descrição: Valida os códigos detectados, executa a máquina de estados de gravação e retorna o estado do overlay.
+        Description: Validates the detected codes, runs the recording state machine and returns the overlay state.
         """
-        if not nf:
-            return
+        overlay = self._default_overlay()
 
-        try:
-            df_log = pd.read_csv(self.log_file)
+        # Spreadsheet reloaded since these statuses were cached: drop the entries for the rows that changed
+        data_version = self.data_loader.version
+        if data_version != self._cache_data_version:
+            changed = self.data_loader.changes_since(self._cache_data_version, data_version)
+            if changed is None:
+                self.scan_results_cache.clear()
+            else:
+                for code in changed:
+                    self.scan_results_cache.invalidate(code)
+            self._cache_data_version = data_version
+
+        # Partial / corrupted reads are dropped before any lookup, cache entry or log line
+        well_formed = []
+        for obj in decoded_objects:
+            if self.data_loader.is_well_formed(obj.data.decode("utf-8")):
+                well_formed.append(obj)
+            else:
+                self.rejected_reads += 1
+                overlay["polygons"].append((obj.polygon, (128, 128, 128)))
+        if decoded_objects and not well_formed:
+            overlay["header_text"] = "Leitura incompleta - reposicione a etiqueta"
+            overlay["header_color"] = (160, 160, 160)
+        decoded_objects = well_formed
+
+        # --- PROCESS DETECTED CODES ---
+        valid_nf_in_frame = None # To track what we see NOW
+        valid_tracking_code_in_frame = None 
+        is_valid_nf_duplicate = False
+
+        # MULTIPLE NFs CHECK
+        # Check for UNIQUE codes. If we have multiple QRs but they are identical, it's fine.
+        unique_codes_in_frame = set()
+        for obj in decoded_objects:
+            unique_codes_in_frame.add(obj.data.decode("utf-8"))
+
+        if len(unique_codes_in_frame) > 1:
+            overlay["header_text"] = "ERRO: Multiplas Notas Distintas! Deixe apenas uma."
+            overlay["header_color"] = (0, 0, 255)
             
-            # Simple heuristic: Look for rows where Mensagem contains "NF: <nf>" 
-            # and status is SUCESSO.
-            updated = False
+            # Red Boxes on all
+            for obj in decoded_objects:
+                overlay["polygons"].append((obj.polygon, (0, 0, 255)))
             
-            # Helper to check if row matches
-            def is_match(row):
-                msg = str(row['Mensagem'])
-                return row['Status'] == 'SUCESSO' and (f"NF: {nf}" in msg or f"NF {nf}" in msg)
-
-            for index, row in df_log.iterrows():
-                if is_match(row):
-                    # Only update if empty or overwrite? Let's overwrite/append
-                    # If duplicate scans exist, we might update all or just latest. 
-                    # Simplicity: Update all for this NF.
-                    df_log.at[index, 'Video_Evidence'] = video_filename
-                    updated = True
+            # SKIP PROCESSING
             
-            if updated:
-                df_log.to_csv(self.log_file, index=False)
-                # print(f"Log atualizado para NF {nf}: {video_filename}")
+        else:
+            # SINGLE OR NO OBJECT PROCESSING
+            for obj in decoded_objects:
+                code_data = obj.data.decode("utf-8")
                 
-        except Exception as e:
-            print(f"Erro ao atualizar log com vídeo: {e}")
+                # Default Visuals
+                status_text = "Processando..."
+                rect_color = (255, 255, 255)
+                header_color = (255, 255, 255)
+                found_nf = None
+                is_duplicate = False
 
-    def start_recording(self, nf):
-        """
-        Descrição: Inicia a gravação de vídeo para uma Nota Fiscal.
-        Description: Starts video recording for a Invoice (NF).
-        """
-        if self.is_recording:
-            self.stop_recording()
+                # 1. Processing / Validation
+                # Check cache first to avoid re-querying dataframe every frame
+                cached = self.scan_results_cache.get(code_data)
+                if cached is not None:
+                     status_text, header_color, rect_color, found_nf = cached
+                     # Update Access Time
+                     self.last_scan_time.set(code_data, current_time)
+                     # Re-check duplicate status in real-time because scanned_items grows
+                     if code_data in self.scanned_items:
+                         is_duplicate = True
+                         # Force update visual if it was cached as success but now is duplicate
+                         if "Segure" in status_text or "OK:" in status_text:
+                             status_text = f"ALERTA: Pedido JA Conferido!"
+                             rect_color = (0, 255, 255)
+                             header_color = (0, 255, 255)
+                             # Update cache to reflect duplicate status
+                             self.scan_results_cache.replace(code_data, (status_text, header_color, rect_color, found_nf))
 
-        print(f"Iniciando Gravação para NF: {nf}")
-        self.is_recording = True
-        self.current_recording_nf = nf
-        
-        # Format: NF{NUMBER}.mp4 as requested
-        self.current_video_filename = f"NF{nf}.mp4"
-        filepath = os.path.join(self.video_dir, self.current_video_filename)
+                else:
+                     # New Code Processing
+                     self.last_scan_time.set(code_data, current_time)
+                     result = self.data_loader.check_tracking(code_data)
+                     
+                     if result and result["found"]:
+                         # FOUND
+                         found_nf = result["nf"]
+                         dest = result["destinatario"]
+                         
+                         if code_data in self.scanned_items:
+                             is_duplicate = True
+                             status_text = f"ALERTA: Pedido JA Conferido!"
+                             rect_color = (0, 255, 255) # Yellow
+                             header_color = (0, 255, 255)
+                             self.log_scan(code_data, "DUPLICADO", f"NF: {found_nf}", nf=found_nf)
+                         else:
+                             is_duplicate = False
+                             # WAIT FOR HOLD - Do NOT commit yet
+                             status_text = f"Identificado: {found_nf} - Segure..."
+                             rect_color = (0, 255, 255) # Yellow (Wait)
+                             header_color = (0, 255, 255)
+                             # Do NOT add to scanned_items yet
+                             # Do NOT log yet
+                     else:
+                         # NOT FOUND
+                         status_text = f"ERRO: Rastreio '{code_data}' Nao Consta"
+                         message = "Rastreio nao encontrado"
+                         # Likely misread / mistyped label: point at the nearest orders
+                         suggestions = self.data_loader.suggest(code_data) if result is not None else []
+                         if suggestions:
+                             near_code, near_nf = suggestions[0]
+                             status_text += f" - Parecido: {near_code} (NF {near_nf})"
+                             message += " - parecido com " + " / ".join(code for code, _ in suggestions)
+                         rect_color = (0, 0, 255) # Red
+                         header_color = (0, 0, 255)
+                         found_nf = None
+                         self.log_scan(code_data, "ERRO", message)
+
+                     # Save to Cache
+                     self.scan_results_cache.set(code_data, (status_text, header_color, rect_color, found_nf))
+
+                # 2. Visuals per Code
+                # OVERRIDE: If this is the NF we are currently recording, keep it GREEN!
+                if self.is_recording and found_nf == self.current_recording_nf:
+                     status_text = f"NF {found_nf} - Gravando"
+                     rect_color = (0, 255, 0)
+                     header_color = (0, 255, 0)
+
+                # Polygon
+                overlay["polygons"].append((obj.polygon, rect_color))
+                
+                # Update Header (Last code processed takes precedence on header text)
+                overlay["header_text"] = status_text
+                overlay["header_color"] = header_color
+                
+                # 3. Identify if this is a valid NF for Recording purposes
+                if found_nf:
+                    valid_nf_in_frame = found_nf
+                    valid_tracking_code_in_frame = code_data
+                    # Important: If we are effectively treating it as "Green" because we are recording it,
+                    # we should behave as if it's not a duplicate for the purpose of maintaining the session.
+                    if self.is_recording and found_nf == self.current_recording_nf:
+                        is_valid_nf_duplicate = False
+                    else:
+                        is_valid_nf_duplicate = is_duplicate
+
+        # --- RECORDING STATE MACHINE ---
+        if valid_nf_in_frame:
+            # We see a valid NF right now
+            self.last_nf_seen_time = current_time
+            
+            # --- STABILITY CHECK ---
+            if self.current_candidate_nf != valid_nf_in_frame:
+                self.current_candidate_nf = valid_nf_in_frame
+                self.candidate_start_time = current_time
+            
+            # Calculate how long we have been staring at this specific NF
+            elapsed_hold = current_time - self.candidate_start_time
+            
+            # Visual Feedback for Hold
+            if elapsed_hold < self.stability_duration and not self.is_recording and not is_valid_nf_duplicate:
+                # Show progress
+                pct = int((elapsed_hold / self.stability_duration) * 100)
+                overlay["hold_text"] = f"Segure... {pct}%"
+            
+            # Trigger Condition
+            should_start = (elapsed_hold >= self.stability_duration)
+            
+            if not self.is_recording:
+                # START NEW RECORDING ONLY IF NOT DUPLICATE AND STABLE
+                if not is_valid_nf_duplicate:
+                    if should_start:
+                        # COMMIT SCAN HERE
+                        if valid_tracking_code_in_frame and valid_tracking_code_in_frame not in self.scanned_items:
+                            # log_scan also marks the code in the duplicate index
+                            self.log_scan(valid_tracking_code_in_frame, "SUCESSO", f"NF: {valid_nf_in_frame}", nf=valid_nf_in_frame)
+                            
+                        self.start_recording(valid_nf_in_frame)
+                else:
+                    pass # Duplicate handling
+            
+            elif self.is_recording:
+                # ALREADY RECORDING
+                # Check if it is the SAME NF
+                if self.current_recording_nf == valid_nf_in_frame:
+                     pass
+                else:
+                    # SWITCHING NF (A -> B)
+                    if should_start:
+                         print(f"Troca detectada: {self.current_recording_nf} -> {valid_nf_in_frame}")
+                         self.stop_recording()
+                         if not is_valid_nf_duplicate:
+                             # COMMIT SCAN HERE (SWITCH CASE)
+                             if valid_tracking_code_in_frame and valid_tracking_code_in_frame not in self.scanned_items:
+                                 # log_scan also marks the code in the duplicate index
+                                 self.log_scan(valid_tracking_code_in_frame, "SUCESSO", f"NF: {valid_nf_in_frame}", nf=valid_nf_in_frame)
+                             
+                             self.start_recording(valid_nf_in_frame)
         
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v') 
-        self.video_writer = cv2.VideoWriter(filepath, fourcc, 20.0, (1280, 720))
+        else:
+            # No valid NF in this frame
+            self.current_candidate_nf = None # Reset candidate
+            
+            if self.is_recording:
+                # Check Buffer
+                if (current_time - self.last_nf_seen_time) > self.post_scan_buffer:
+                    self.stop_recording()
+                else:
+                    # Continue recording (Buffer Phase)
+                    pass
 
-    def stop_recording(self):
+        return overlay
+
+    def _draw_overlay(self, img, overlay, current_time):
         """
-        Descrição: Para a gravação atual e finaliza o arquivo de vídeo.
-        Description: Stops the current recording and finalizes the video file.
+        Descrição: Desenha o cabeçalho, polígonos, progresso, indicador REC e botões sobre o quadro.
+        Description: Draws the header, polygons, hold progress, REC indicator and buttons on the frame.
         """
+        # Header Layout
+        cv2.rectangle(img, (0, 0), (img.shape[1], 80), (0, 0, 0), cv2.FILLED)
+
+        for polygon, color in overlay["polygons"]:
+            pts = np.array([polygon], np.int32).reshape((-1, 1, 2))
+            cv2.polylines(img, [pts], True, color, 5)
+
+        if overlay["hold_text"]:
+            cv2.putText(img, overlay["hold_text"], (20, 100), self.font, 0.7, (0, 255, 255), 2)
+
+        # Update Frame content (Header)
+        cv2.putText(img, overlay["header_text"], (20, 50), self.font, 1, overlay["header_color"], 2)
+        
+        # Update Frame content (REC Indicator)
         if self.is_recording:
-            print(f"Parando Gravação de {self.current_recording_nf}...")
-            if self.video_writer:
-                self.video_writer.release()
-                self.video_writer = None
-            
-            # Update Log immediately
-            if self.current_recording_nf:
-                 self._update_log_with_video(self.current_recording_nf, self.current_video_filename)
+             # Blinking Red Dot
+            if int(current_time * 2) % 2 == 0:
+                cv2.circle(img, (1250, 50), 20, (0, 0, 255), cv2.FILLED)
+                cv2.putText(img, "REC", (1160, 60), self.font, 1, (0, 0, 255), 2)
+                # Show which NF is recording
+                cv2.putText(img, f"NF: {self.current_recording_nf}", (1100, 100), self.font, 0.7, (0, 0, 255), 2)
 
-            self.is_recording = False
-            self.current_recording_nf = None
-            self.current_video_filename = None
+        # Governor shedding work: tell the operator why reads may feel slower
+        if self.governor is not None and self.governor.index > 0:
+            cv2.putText(img, self.governor.status_text(), (img.shape[1] - 520, img.shape[0] - 25), self.font, 0.6, (0, 165, 255), 2)
 
-    def _mouse_callback(self, event, x, y, flags, param):
-        if event == cv2.EVENT_LBUTTONDOWN:
-            for btn in self.buttons:
-                if btn.is_clicked(x, y):
-                    if btn.text == "HOME":
-                         self.nav_action = "home"
-                    elif btn.text == "VIDEOS":
-                         self.nav_action = "gallery"
+        # Draw Navigation Buttons
+        for btn in self.buttons:
+            btn.draw(img)
 
-    def run(self):
+    def _begin_run(self):
         """
-        Descrição: Loop principal de captura de vídeo e processamento de QR Codes.
-        Description: Main loop for video capture and QR Code processing.
+        Descrição: Prepara botões, janela e pipeline antes do primeiro quadro.
+        Description: Sets up buttons, window and pipeline before the first frame.
         """
         # Define Buttons
         # Bottom Left for Navigation
@@ -291,243 +3319,245 @@ class BarcodeScanner:
             ScannerButton("VIDEOS", 140, 650, 120, 50, (50, 50, 50), (255, 255, 255))
         ]
         
-        window_name = "Conferencia Gueddai"
-        cv2.namedWindow(window_name)
-        cv2.setMouseCallback(window_name, self._mouse_callback)
+        if not self.headless:
+            cv2.namedWindow(self.window_name)
+            cv2.setMouseCallback(self.window_name, self._mouse_callback)
 
-        while True:
-            # Check external navigation request
-            if self.nav_action:
-                if self.is_recording:
-                    self.stop_recording()
-                break
+        self.overlay = self._default_overlay()
+        self.frames = 0
+        self.wall_start = time.perf_counter()
+        if self.owns_station and not self.replay:
+            self.station.start_watching()
+        # Near-miss suggestion index, built before the first unknown code shows up
+        threading.Thread(target=self.data_loader.warm_suggestions, name="suggestions-warmup", daemon=True).start()
+        self._start_pipeline()
+
+    def step(self, timeout=0.5):
+        """
+        Descrição: Processa um quadro (decodificação, estado, desenho, gravação, exibição). Retorna "frame", "idle" (nenhum quadro no prazo) ou "stop".
+        Description: Processes one frame (decode, state, draw, record, display). Returns "frame", "idle" (no frame within the timeout) or "stop".
+        """
+        # Check external navigation request
+        if self.nav_action:
+            if self.is_recording:
+                self.stop_recording()
+            return "stop"
 
-            success, img = self.cap.read()
-            if not success:
+        self.perf.begin_frame()
+        packet = self._next_frame(timeout)
+        if packet == "idle":
+            return "idle"
+        if packet is None:
+            if self.source.live:
                 print("Erro ao acessar a webcam.")
-                break
+            elif self.is_recording:
+                # End of the recorded footage: close the evidence as if the package left
+                self.stop_recording()
+            return "stop"
 
-            current_time = time.time()
-            decoded_objects = decode(img, symbols=[ZBarSymbol.QRCODE])
-            
-            # Header Layout
-            cv2.rectangle(img, (0, 0), (1280, 80), (0, 0, 0), cv2.FILLED)
-            current_header_text = "Aguardando Nota..."
-            current_header_color = (255, 255, 255)
-
-            # --- PROCESS DETECTED CODES ---
-            valid_nf_in_frame = None # To track what we see NOW
-            valid_tracking_code_in_frame = None 
-            is_valid_nf_duplicate = False
-
-            # MULTIPLE NFs CHECK
-            # Check for UNIQUE codes. If we have multiple QRs but they are identical, it's fine.
-            unique_codes_in_frame = set()
-            for obj in decoded_objects:
-                unique_codes_in_frame.add(obj.data.decode("utf-8"))
+        frame_id, current_time, img = packet
+        self.last_frame_time = current_time
+        self.frames += 1
+        self.perf.lap("capture")
+        work_start = time.perf_counter() # Frame budget: work only, not the wait for the camera
 
-            if len(unique_codes_in_frame) > 1:
-                current_header_text = "ERRO: Multiplas Notas Distintas! Deixe apenas uma."
-                current_header_color = (0, 0, 255)
-                
-                # Draw Red Boxes on all
-                for obj in decoded_objects:
-                    pts = np.array([obj.polygon], np.int32).reshape((-1, 1, 2))
-                    cv2.polylines(img, [pts], True, (0, 0, 255), 5)
-                
-                # SKIP PROCESSING
-                
-            else:
-                # SINGLE OR NO OBJECT PROCESSING
-                for obj in decoded_objects:
-                    code_data = obj.data.decode("utf-8")
-                    
-                    # Default Visuals
-                    status_text = "Processando..."
-                    rect_color = (255, 255, 255)
-                    header_color = (255, 255, 255)
-                    found_nf = None
-                    is_duplicate = False
-
-                    # 1. Processing / Validation
-                    # Check cache first to avoid re-querying dataframe every frame
-                    if code_data in self.scan_results_cache:
-                         status_text, header_color, rect_color, found_nf = self.scan_results_cache[code_data]
-                         # Update Access Time
-                         self.last_scan_time[code_data] = current_time
-                         # Re-check duplicate status in real-time because scanned_items grows
-                         if code_data in self.scanned_items:
-                             is_duplicate = True
-                             # Force update visual if it was cached as success but now is duplicate
-                             if "Segure" in status_text or "OK:" in status_text:
-                                 status_text = f"ALERTA: Pedido JA Conferido!"
-                                 rect_color = (0, 255, 255)
-                                 header_color = (0, 255, 255)
-                                 # Update cache to reflect duplicate status
-                                 self.scan_results_cache[code_data] = (status_text, header_color, rect_color, found_nf)
+        # Feed every new decode result to the state machine, in capture order
+        detections = self._pending_detections(packet)
+        if not self.use_threads:
+            self.perf.lap("decode") # Threaded mode: timed on the decode thread
+        for _, detection_time, decoded_objects in detections:
+            self.overlay = self._process_detections(decoded_objects, detection_time)
+        self.perf.lap("lookup")
 
-                    else:
-                         # New Code Processing
-                         self.last_scan_time[code_data] = current_time
-                         result = self.data_loader.check_tracking(code_data)
-                         
-                         if result and result["found"]:
-                             # FOUND
-                             found_nf = result["nf"]
-                             dest = result["destinatario"]
-                             
-                             if code_data in self.scanned_items:
-                                 is_duplicate = True
-                                 status_text = f"ALERTA: Pedido JA Conferido!"
-                                 rect_color = (0, 255, 255) # Yellow
-                                 header_color = (0, 255, 255)
-                                 self.log_scan(code_data, "DUPLICADO", f"NF: {found_nf}")
-                             else:
-                                 is_duplicate = False
-                                 # WAIT FOR HOLD - Do NOT commit yet
-                                 status_text = f"Identificado: {found_nf} - Segure..."
-                                 rect_color = (0, 255, 255) # Yellow (Wait)
-                                 header_color = (0, 255, 255)
-                                 # Do NOT add to scanned_items yet
-                                 # Do NOT log yet
-                         else:
-                             # NOT FOUND
-                             status_text = f"ERRO: Rastreio '{code_data}' Nao Consta"
-                             rect_color = (0, 0, 255) # Red
-                             header_color = (0, 0, 255)
-                             found_nf = None
-                             self.log_scan(code_data, "ERRO", "Rastreio nao encontrado")
-
-                         # Save to Cache
-                         self.scan_results_cache[code_data] = (status_text, header_color, rect_color, found_nf)
-
-                    # 2. Visuals per Code
-                    # OVERRIDE: If this is the NF we are currently recording, keep it GREEN!
-                    if self.is_recording and found_nf == self.current_recording_nf:
-                         status_text = f"NF {found_nf} - Gravando"
-                         rect_color = (0, 255, 0)
-                         header_color = (0, 255, 0)
-
-                    # Draw Polygon
-                    pts = np.array([obj.polygon], np.int32).reshape((-1, 1, 2))
-                    cv2.polylines(img, [pts], True, rect_color, 5)
-                    
-                    # Update Header (Last code processed takes precedence on header text)
-                    current_header_text = status_text
-                    current_header_color = header_color
-                    
-                    # 3. Identify if this is a valid NF for Recording purposes
-                    if found_nf:
-                        valid_nf_in_frame = found_nf
-                        valid_tracking_code_in_frame = code_data
-                        # Important: If we are effectively treating it as "Green" because we are recording it,
-                        # we should behave as if it's not a duplicate for the purpose of maintaining the session.
-                        if self.is_recording and found_nf == self.current_recording_nf:
-                            is_valid_nf_duplicate = False
-                        else:
-                            is_valid_nf_duplicate = is_duplicate
-
-            # --- RECORDING STATE MACHINE ---
-            if valid_nf_in_frame:
-                # We see a valid NF right now
-                self.last_nf_seen_time = current_time
-                
-                # --- STABILITY CHECK ---
-                if self.current_candidate_nf != valid_nf_in_frame:
-                    self.current_candidate_nf = valid_nf_in_frame
-                    self.candidate_start_time = current_time
-                
-                # Calculate how long we have been staring at this specific NF
-                elapsed_hold = current_time - self.candidate_start_time
-                
-                # Visual Feedback for Hold
-                if elapsed_hold < self.stability_duration and not self.is_recording and not is_valid_nf_duplicate:
-                    # Show progress
-                    pct = int((elapsed_hold / self.stability_duration) * 100)
-                    cv2.putText(img, f"Segure... {pct}%", (20, 100), self.font, 0.7, (0, 255, 255), 2)
-                
-                # Trigger Condition
-                should_start = (elapsed_hold >= self.stability_duration)
-                
-                if not self.is_recording:
-                    # START NEW RECORDING ONLY IF NOT DUPLICATE AND STABLE
-                    if not is_valid_nf_duplicate:
-                        if should_start:
-                            # COMMIT SCAN HERE
-                            if valid_tracking_code_in_frame and valid_tracking_code_in_frame not in self.scanned_items:
-                                self.scanned_items.add(valid_tracking_code_in_frame)
-                                self.log_scan(valid_tracking_code_in_frame, "SUCESSO", f"NF: {valid_nf_in_frame}")
-                                
-                            self.start_recording(valid_nf_in_frame)
-                    else:
-                        pass # Duplicate handling
-                
-                elif self.is_recording:
-                    # ALREADY RECORDING
-                    # Check if it is the SAME NF
-                    if self.current_recording_nf == valid_nf_in_frame:
-                         pass
-                    else:
-                        # SWITCHING NF (A -> B)
-                        if should_start:
-                             print(f"Troca detectada: {self.current_recording_nf} -> {valid_nf_in_frame}")
-                             self.stop_recording()
-                             if not is_valid_nf_duplicate:
-                                 # COMMIT SCAN HERE (SWITCH CASE)
-                                 if valid_tracking_code_in_frame and valid_tracking_code_in_frame not in self.scanned_items:
-                                     self.scanned_items.add(valid_tracking_code_in_frame)
-                                     self.log_scan(valid_tracking_code_in_frame, "SUCESSO", f"NF: {valid_nf_in_frame}")
-                                 
-                                 self.start_recording(valid_nf_in_frame)
-            
-            else:
-                # No valid NF in this frame
-                self.current_candidate_nf = None # Reset candidate
-                
-                if self.is_recording:
-                    # Check Buffer
-                    if (current_time - self.last_nf_seen_time) > self.post_scan_buffer:
-                        self.stop_recording()
-                    else:
-                        # Continue recording (Buffer Phase)
-                        pass
+        self._draw_overlay(img, self.overlay, current_time)
+        self.perf.lap("draw")
 
-            # Update Frame content (Header)
-            cv2.putText(img, current_header_text, (20, 50), self.font, 1, current_header_color, 2)
-            
-            # Update Frame content (REC Indicator)
+        # Write Frame if recording
+        if self.is_recording:
+            self.recorder.write(img, current_time)
+        else:
+            self.recorder.push_preroll(current_time, img)
+        self.perf.lap("record")
+
+        if self.headless:
+            self._observe_budget(work_start, current_time)
+            self.perf.end_frame(current_time)
+            return "frame"
+
+        # Show (perf panel on a copy, the recorder still holds img; skipped while the governor sheds overlay work)
+        light = self.governor is not None and self.governor.level.light_overlay
+        if self.perf.show_overlay and not light:
+            shown = img.copy()
+            extra = [f"gravador: fila {self.recorder.queue_depth}, descartados {self.recorder.dropped_frames}"]
+            if self.decode_gate is not None:
+                gate = self.decode_gate.stats
+                extra.append(f"decodificacao: {gate['full']} completas, {gate['roi']} ROI, {gate['tracked']} rastreadas, {gate['skipped']} puladas")
+            decoder = self.decoder.stats()
+            extra.append(f"{decoder['backend']}: media {decoder['mean_ms']:.1f} ms, p95 {decoder['p95_ms']:.1f} ms, leitura {decoder['hit_rate'] * 100:.0f}%")
+            if self.governor is not None:
+                extra.append(f"{self.governor.status_text()}, decodificacao {self.governor.decode_ms:.1f} ms")
+            self.perf.draw(shown, extra)
+            cv2.imshow(self.window_name, shown)
+        else:
+            cv2.imshow(self.window_name, img)
+        self.perf.lap("display")
+        self._observe_budget(work_start, current_time)
+        return "frame"
+
+    def _observe_budget(self, work_start, current_time):
+        if self.governor is not None:
+            self.governor.observe_frame((time.perf_counter() - work_start) * 1000.0, current_time)
+
+    def handle_key(self, key):
+        """
+        Descrição: Trata uma tecla da janela. Retorna True se o operador pediu para sair.
+        Description: Handles a window key press. Returns True if the operator asked to quit.
+        """
+        if key == ord('p'):
+            self.perf.show_overlay = not self.perf.show_overlay
+        elif key == ord('c'):
+            self.perf.start_profile()
+        elif key == ord('q'):
             if self.is_recording:
-                 # Blinking Red Dot
-                if int(current_time * 2) % 2 == 0:
-                    cv2.circle(img, (1250, 50), 20, (0, 0, 255), cv2.FILLED)
-                    cv2.putText(img, "REC", (1160, 60), self.font, 1, (0, 0, 255), 2)
-                    # Show which NF is recording
-                    cv2.putText(img, f"NF: {self.current_recording_nf}", (1100, 100), self.font, 0.7, (0, 0, 255), 2)
-
-            # Draw Navigation Buttons
-            for btn in self.buttons:
-                btn.draw(img)
+                self.stop_recording()
+            return True
+        return False
 
-            # Write Frame if recording
-            if self.is_recording and self.video_writer:
-                self.video_writer.write(img)
+    def _end_run(self):
+        """
+        Descrição: Encerra pipeline e gravador, grava as métricas e, se a estação for própria, finaliza o log.
+        Description: Shuts down pipeline and recorder, dumps the metrics and, if the station is owned, finalizes the log.
+        """
+        try:
+            self._stop_pipeline()
+            # Wait for pending frames and log updates before handing control back
+            self.recorder.shutdown()
+            if self.owns_station:
+                self.station.stop_watching()
+                # Single CSV rewrite per session, with the video evidence filled in
+                self.station.finish()
+                if self.replay_station_dir is not None:
+                    # Keep the replay's own log next to its metrics; the station itself is discarded
+                    stamp = datetime.datetime.now().strftime('%Y-%m-%d_%H%M%S')
+                    self.replay_log_file = os.path.join(self.report_dir, f"replay_log_{stamp}.csv")
+                    shutil.copyfile(self.station.log_file, self.replay_log_file)
+            self.perf.dump()
+        finally:
+            self.scanned_items.listeners.remove(self._on_code_scanned)
+            if self.owns_station:
+                self.station.close()
+            if self.replay_station_dir is not None:
+                shutil.rmtree(self.replay_station_dir, ignore_errors=True)
 
-            # Show
-            cv2.imshow(window_name, img)
-            
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                if self.is_recording:
-                    self.stop_recording()
-                break
+        elapsed = time.perf_counter() - self.wall_start
+        self.run_stats = {
+            "frames": self.frames,
+            "elapsed_s": round(elapsed, 3),
+            "fps": round(self.frames / elapsed, 2) if elapsed > 0 else 0.0,
+            "recorder": self.recorder.stats(),
+            "decode_gate": dict(self.decode_gate.stats) if self.decode_gate is not None else {},
+            "decoder": self.decoder.stats(),
+            "rejected_reads": self.rejected_reads,
+            "governor": self.governor.stats() if self.governor is not None else {},
+            "perf": self.perf.summary(),
+        }
+        if self.replay_log_file:
+            self.run_stats["replay_log"] = self.replay_log_file
 
-        self.cap.release()
-        cv2.destroyAllWindows()
+        self.source.release()
+
+    def run(self):
+        """
+        Descrição: Loop principal de exibição/gravação. A captura e a decodificação rodam em threads próprias.
+        Description: Main display/record loop. Capture and decoding run on their own threads.
+        """
+        self._begin_run()
+        try:
+            while True:
+                state = self.step()
+                if state == "stop":
+                    break
+                if state == "idle" or self.headless:
+                    continue
+
+                key = cv2.waitKey(1) & 0xFF
+                self.perf.lap("waitkey")
+                self.perf.end_frame(self.last_frame_time)
+                if self.handle_key(key):
+                    break
+        finally:
+            self._end_run()
+
+        if not self.headless:
+            cv2.destroyAllWindows()
         return self.nav_action
 
 
+class MultiCameraStation:
+    """
+    Descrição: Várias câmeras (bancadas) em um só processo. Cada câmera tem captura/decodificação/gravação próprias; planilha, índice de duplicatas e log são compartilhados.
+    Description: Several cameras (benches) in a single process. Each camera has its own capture/decode/recording; spreadsheet, duplicate index and log are shared.
+    """
+    def __init__(self, data_loader, sources, video_path="videos_auditoria", report_path=".", **scanner_kwargs):
+        self.station = ScanStation(data_loader, report_path)
+        self.scanners = []
+        for camera_id, source in enumerate(sources):
+            self.scanners.append(BarcodeScanner(
+                data_loader, video_path=video_path, report_path=report_path,
+                source=source, station=self.station, camera_id=camera_id, **scanner_kwargs,
+            ))
+        self.nav_action = None
+
+    def run(self):
+        """
+        Descrição: Alterna entre as câmeras na thread principal (as janelas do OpenCV só podem ser usadas por ela) até o operador sair.
+        Description: Round-robins the cameras on the main thread (OpenCV windows are only usable from it) until the operator quits.
+        """
+        for scanner in self.scanners:
+            scanner._begin_run()
+        self.station.start_watching()
+
+        active = list(self.scanners)
+        try:
+            while active:
+                for scanner in list(active):
+                    # Short timeout: a slow camera must not stall the other benches
+                    state = scanner.step(timeout=0.005)
+                    if state == "stop":
+                        active.remove(scanner)
+                        if scanner.nav_action:
+                            self.nav_action = scanner.nav_action
+                    elif state == "frame" and not scanner.headless:
+                        scanner.perf.end_frame(scanner.last_frame_time)
+
+                if self.nav_action:
+                    # Navigation from any bench leaves the whole station
+                    for scanner in active:
+                        scanner.nav_action = self.nav_action
+                    continue
+
+                # One event pump for every window; keys apply to all benches
+                key = cv2.waitKey(1) & 0xFF
+                quit_requested = False
+                for scanner in active:
+                    quit_requested = scanner.handle_key(key) or quit_requested
+                if quit_requested:
+                    break
+        finally:
+            for scanner in self.scanners:
+                try:
+                    scanner._end_run()
+                except Exception as e:
+                    print(f"Erro ao encerrar a bancada {scanner.camera_id + 1}: {e}")
+            self.station.stop_watching()
+            try:
+                # Shared log: one export and one index save for the whole station
+                self.station.finish()
+            finally:
+                self.station.close()
 
-        self.cap.release()
         cv2.destroyAllWindows()
+        return self.nav_action
 
 
 def rounded_rect(canvas, x, y, w, h, c, bg_color):
@@ -599,9 +3629,10 @@ class App(TkinterDnD.Tk if HAS_DND else tk.Tk):
     Descrição: Classe principal da aplicação que gerencia a janela e a navegação entre páginas.
     Description: Main application class managing the window and page navigation.
     """
-    def __init__(self):
+    def __init__(self, scanner_options=None):
         super().__init__()
         self.title("Conferência Gueddai - Launcher")
+        self.scanner_options = scanner_options or {} # BarcodeScanner kwargs from the command line (decoder, recording profile, pre-roll)
         
         # Modern Dimensions & Center Window
         w, h = 800, 600
@@ -690,6 +3721,8 @@ class LauncherPage(tk.Frame):
         tk.Frame.__init__(self, parent, bg="#F5F6FA")
         self.controller = controller
         self.full_file_path = None
+        self.loading = False
+        self.load_events = queue.Queue() # Loading thread -> Tk thread
         
         self.BG_COLOR = "#F5F6FA"
         self.TEXT_COLOR = "#2D3436"
@@ -744,6 +3777,13 @@ class LauncherPage(tk.Frame):
             cursor="arrow"
         )
         self.btn_start.pack(fill=tk.X, padx=40, pady=20)
+
+        # Spreadsheet loading progress (shown only while loading)
+        self.progress_frame = tk.Frame(self, bg=self.BG_COLOR)
+        self.progress_bar = ttk.Progressbar(self.progress_frame, mode="determinate", maximum=100)
+        self.progress_bar.pack(fill=tk.X)
+        self.lbl_progress = tk.Label(self.progress_frame, text="", font=("Segoe UI", 9), bg=self.BG_COLOR, fg="#636e72")
+        self.lbl_progress.pack(anchor="w", pady=(5, 0))
         
     def setup_events(self):
         """
@@ -796,21 +3836,81 @@ class LauncherPage(tk.Frame):
 
     def start_system(self):
         """
-        Descrição: Valida as entradas e inicia o processo de escaneamento.
-        Description: Validates inputs and starts the scanning process.
+        Descrição: Valida as entradas e carrega a planilha em segundo plano; o scanner começa quando o índice fica pronto.
+        Description: Validates inputs and loads the spreadsheet in the background; the scanner starts once the index is ready.
         """
         if not self.full_file_path or not os.path.exists(self.full_file_path):
             messagebox.showerror("Erro", "Arquivo inválido!")
             return
-            
+        if self.loading:
+            return
+
+        self.loading = True
+        self.btn_start.config(state=tk.DISABLED, text="CARREGANDO PLANILHA...", cursor="arrow")
+        self.progress_bar.config(mode="indeterminate", value=0)
+        self.progress_bar.start(15)
+        self.lbl_progress.config(text="Abrindo planilha...")
+        self.progress_frame.pack(fill=tk.X, padx=40)
+
+        filepath = self.full_file_path
+        def load():
+            try:
+                loader = DataLoader(filepath, progress=lambda done, total: self.load_events.put(("progress", (done, total))))
+                self.load_events.put(("ready", loader))
+            except Exception as e:
+                self.load_events.put(("error", e))
+
+        threading.Thread(target=load, name="spreadsheet-loader", daemon=True).start()
+        self.after(100, self._poll_loading)
+
+    def _poll_loading(self):
+        """
+        Descrição: Atualiza o progresso do carregamento (thread do Tk) e inicia o scanner quando terminar.
+        Description: Updates the loading progress (on the Tk thread) and starts the scanner when done.
+        """
+        while True:
+            try:
+                kind, payload = self.load_events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "progress":
+                done, total = payload
+                if total:
+                    if str(self.progress_bar.cget("mode")) != "determinate":
+                        self.progress_bar.stop()
+                        self.progress_bar.config(mode="determinate")
+                    self.progress_bar.config(value=min(100, done * 100.0 / total))
+                    self.lbl_progress.config(text=f"{done} de {total} linhas lidas")
+                else:
+                    self.lbl_progress.config(text=f"{done} linhas lidas")
+            elif kind == "ready":
+                self._end_loading()
+                self.run_scanner(payload)
+                return
+            elif kind == "error":
+                self._end_loading()
+                messagebox.showerror("Erro Fatal", f"Ocorreu um erro:\n{payload}")
+                return
+        self.after(100, self._poll_loading)
+
+    def _end_loading(self):
+        self.loading = False
+        self.progress_bar.stop()
+        self.progress_frame.pack_forget()
+        self.btn_start.config(state=tk.NORMAL, text="INICIAR SISTEMA", cursor="hand2")
+
+    def run_scanner(self, loader):
+        """
+        Descrição: Esconde o launcher e roda o scanner com a planilha já carregada.
+        Description: Hides the launcher and runs the scanner with the already loaded spreadsheet.
+        """
         self.controller.withdraw() # Hide Launcher
         try:
-            loader = DataLoader(self.full_file_path)
             # Default paths
             v_path = "videos_auditoria"
             r_path = "."
             
-            scanner = BarcodeScanner(loader, video_path=v_path, report_path=r_path)
+            scanner = BarcodeScanner(loader, video_path=v_path, report_path=r_path, **self.controller.scanner_options)
             exit_code = scanner.run()
             
             # On return (q pressed or button clicked)
@@ -830,10 +3930,29 @@ class VideoGalleryPage(tk.Frame):
     Descrição: Página de galeria para visualizar e buscar vídeos gravados.
     Description: Gallery page to view and search recorded videos.
     """
+    PAGE_SIZE = 200 # Rows fetched from the catalog per scroll step
+    SEARCH_DEBOUNCE_MS = 150 # Search runs once the operator pauses typing
+
     def __init__(self, parent, controller):
         tk.Frame.__init__(self, parent, bg="#F5F6FA")
         self.controller = controller
         self.video_dir = "videos_auditoria"
+        self.catalog = None # Opened on first show
+        self.search_index = None # Built off the Tk thread on first show
+        self.search_job = None
+        self.query = ""
+        self.results = None # Filenames matching the query (None: whole catalog, newest first)
+        self.results_shown = 0
+        self.last_key = None # (mtime, filename) of the last row shown
+        self.has_more = False
+        self.page_pending = False
+        self.sync_thread = None
+        self.sync_events = queue.Queue() # Sync thread -> Tk thread
+        self.thumbnails = None # ThumbnailCache, opened with the catalog
+        self.thumb_events = queue.Queue() # Thumbnail pool -> Tk thread
+        self.thumb_images = {} # filename -> PhotoImage (Tk drops images nobody references)
+        self.preview_image = None
+        self.preview_file = None
         
         self.setup_ui()
         
@@ -845,6 +3964,9 @@ class VideoGalleryPage(tk.Frame):
         
         lbl_title = tk.Label(header_frame, text="Galeria de Vídeos", font=("Segoe UI", 24, "bold"), bg="#F5F6FA", fg="#2D3436")
         lbl_title.pack(side="left")
+
+        self.lbl_status = tk.Label(header_frame, text="", font=("Segoe UI", 10), bg="#F5F6FA", fg="#636E72")
+        self.lbl_status.pack(side="right")
         
         # Search Bar
         search_frame = tk.Frame(self, bg="#F5F6FA")
@@ -854,83 +3976,279 @@ class VideoGalleryPage(tk.Frame):
         self.search_entry.pack(side="left", fill="x", expand=True, padx=(0, 10))
         self.search_entry.entry.bind("<KeyRelease>", self.filter_videos)
         
-        btn_refresh = tk.Button(search_frame, text="🔄 Atualizar", font=("Segoe UI", 10), command=self.load_videos, bg="white", bd=0, cursor="hand2")
+        btn_refresh = tk.Button(search_frame, text="🔄 Atualizar", font=("Segoe UI", 10), command=lambda: self.load_videos(full=True), bg="white", bd=0, cursor="hand2")
         btn_refresh.pack(side="right")
         
         # Video List (Treeview)
         list_frame = tk.Frame(self, bg="white")
         list_frame.pack(fill="both", expand=True, padx=40, pady=(0, 40))
         
-        columns = ("nf", "filename", "date")
-        self.tree = ttk.Treeview(list_frame, columns=columns, show="headings")
+        # Contact sheet of the selected video
+        self.preview = tk.Label(list_frame, text="Selecione um vídeo", font=("Segoe UI", 10), bg="white", fg="#636E72")
+        self.preview.pack(side="right", fill="y", padx=(10, 0))
+
+        style = ttk.Style(self)
+        style.configure("Gallery.Treeview", rowheight=72) # Fits a 16:9 thumbnail
+
+        columns = ("nf", "filename", "date", "duration", "size")
+        self.tree = ttk.Treeview(list_frame, columns=columns, show="tree headings", style="Gallery.Treeview")
+        self.tree.heading("#0", text="")
+        self.tree.column("#0", width=140, stretch=False)
         self.tree.heading("nf", text="NF")
         self.tree.heading("filename", text="Arquivo")
         self.tree.heading("date", text="Data")
+        self.tree.heading("duration", text="Duração")
+        self.tree.heading("size", text="Tamanho")
         
         self.tree.column("nf", width=100)
         self.tree.column("filename", width=300)
         self.tree.column("date", width=150)
+        self.tree.column("duration", width=80)
+        self.tree.column("size", width=80)
         
         self.tree.pack(side="left", fill="both", expand=True)
         
-        scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=self.tree.yview)
-        scrollbar.pack(side="right", fill="y")
-        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=self.tree.yview)
+        self.scrollbar.pack(side="right", fill="y")
+        self.tree.configure(yscrollcommand=self._on_tree_scroll)
         
         self.tree.bind("<Double-1>", self.on_double_click)
+        self.tree.bind("<<TreeviewSelect>>", self.on_select)
         
     def on_show(self):
         self.load_videos()
+
+    @staticmethod
+    def _row_values(row):
+        filename, nf, mtime, size, duration = row
+        date = datetime.datetime.fromtimestamp(mtime).strftime('%Y-%m-%d %H:%M')
+        return (nf, filename, date, VideoGalleryPage._format_duration(duration), f"{size / (1024 * 1024):.1f} MB")
+
+    @staticmethod
+    def _format_duration(duration):
+        if duration is None or duration < 0:
+            return ""
+        return f"{int(duration // 60)}:{int(duration % 60):02d}"
         
-    def load_videos(self):
+    def load_videos(self, full=False):
         """
-        Descrição: Carrega a lista de vídeos da pasta e exibe na tabela.
-        Description: Loads the list of videos from the folder and displays them in the table.
+        Descrição: Mostra a primeira página do catálogo na hora e atualiza o catálogo com a pasta em segundo plano (full=True: reexamina todos os arquivos, botão Atualizar).
+        Description: Shows the catalog's first page right away and syncs the catalog with the folder in the background (full=True: re-examines every file, Atualizar button).
         """
-        # Clear
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-            
-        if not os.path.exists(self.video_dir):
-            os.makedirs(self.video_dir)
-            
-        self.all_videos = []
-        
-        for f in os.listdir(self.video_dir):
-            if f.lower().endswith(('.mp4', '.avi')):
-                # Extract NF from filename if possible "NF1234.mp4"
-                nf = "Desconhecido"
-                if f.startswith("NF"):
-                    # Try to extract numbers
-                    try:
-                        base = os.path.splitext(f)[0]
-                        nf = base.replace("NF", "").split("_")[0]
-                    except: pass
-                
-                # Date
-                full_path = os.path.join(self.video_dir, f)
-                mod_time = datetime.datetime.fromtimestamp(os.path.getmtime(full_path)).strftime('%Y-%m-%d %H:%M')
-                
-                self.all_videos.append((nf, f, mod_time))
-                self.tree.insert("", "end", values=(nf, f, mod_time))
+        if self.catalog is None:
+            self.catalog = VideoCatalog(self.video_dir)
+            self.thumbnails = ThumbnailCache(self.video_dir)
+            self.after(100, self._poll_thumbnails)
+        self.reset_view()
+
+        if self.sync_thread is None or not self.sync_thread.is_alive():
+            self.lbl_status.config(text="Atualizando catálogo...")
+            self.sync_thread = threading.Thread(target=self._sync_worker, args=(full,), name="gallery-sync", daemon=True)
+            self.sync_thread.start()
+            self.after(100, self._poll_sync)
+
+    def _sync_worker(self, full=False):
+        # Runs off the Tk thread: folder diff first, then durations in small batches
+        try:
+            added, changed, removed = self.catalog.sync(full=full)
+            self.sync_events.put(("synced", (added, changed, removed)))
+            if self.search_index is None:
+                self.sync_events.put(("index", NFSearchIndex(self.catalog.entries())))
+            while True:
+                probed = self.catalog.probe_pending(limit=50)
+                if not probed:
+                    break
+                self.sync_events.put(("durations", probed))
+        except Exception as e:
+            self.sync_events.put(("error", e))
+        finally:
+            self.sync_events.put(("done", None))
+
+    def _poll_sync(self):
+        """
+        Descrição: Aplica na tabela (thread do Tk) os resultados da thread de sincronização.
+        Description: Applies the sync thread's results to the table (on the Tk thread).
+        """
+        while True:
+            try:
+                kind, payload = self.sync_events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "synced":
+                if any(payload):
+                    added, changed, removed = payload
+                    if self.search_index is not None:
+                        for filename in removed:
+                            self.search_index.remove(filename)
+                        for filename, nf, mtime in added + changed:
+                            self.search_index.add(filename, nf, mtime)
+                    self.refresh_results()
+            elif kind == "index":
+                self.search_index = payload
+                if self.query:
+                    self.refresh_results()
+            elif kind == "durations":
+                for filename, duration in payload:
+                    if self.tree.exists(filename):
+                        self.tree.set(filename, "duration", self._format_duration(duration))
+            elif kind == "error":
+                print(f"Erro ao atualizar catálogo de vídeos: {payload}")
+            elif kind == "done":
+                self.lbl_status.config(text=f"{self.catalog.count()} vídeos")
+                return
+        self.after(100, self._poll_sync)
+
+    def refresh_results(self):
+        """
+        Descrição: Recalcula o resultado da busca atual e mostra a primeira página.
+        Description: Recomputes the current search result and shows its first page.
+        """
+        if self.query and self.search_index is not None:
+            self.results = self.search_index.search(self.query)
+        else:
+            self.results = None
+        self.reset_view()
+
+    def reset_view(self):
+        """
+        Descrição: Mostra só a primeira página (o resto vem ao rolar), alterando na tabela apenas as linhas que mudaram.
+        Description: Shows only the first page (the rest comes on scroll), touching only the table rows that changed.
+        """
+        self.last_key = None
+        self.results_shown = 0
+        # Thumbnails queued for the previous view are no longer a priority
+        self.thumbnails.cancel_pending()
+        self._apply_rows(self._fetch_page())
+
+    def _fetch_page(self):
+        if self.results is not None:
+            rows = self.catalog.rows(self.results[self.results_shown:self.results_shown + self.PAGE_SIZE])
+            self.results_shown += self.PAGE_SIZE
+            self.has_more = self.results_shown < len(self.results)
+            return rows
+        # No index yet (or no query): page straight from the catalog
+        rows = self.catalog.page(after=self.last_key, limit=self.PAGE_SIZE, query=self.query)
+        if rows:
+            self.last_key = (rows[-1][2], rows[-1][0])
+        self.has_more = len(rows) == self.PAGE_SIZE
+        return rows
+
+    def _apply_rows(self, rows):
+        # Diff against what is on screen: delete the stale rows, insert the new ones, move the rest into place
+        wanted = set(row[0] for row in rows)
+        current = self.tree.get_children()
+        stale = [iid for iid in current if iid not in wanted]
+        if stale:
+            self.tree.delete(*stale)
+            for iid in stale:
+                self.thumb_images.pop(iid, None)
+        present = set(current).difference(stale)
+        for index, row in enumerate(rows):
+            if row[0] not in present:
+                self.tree.insert("", index, iid=row[0], values=self._row_values(row))
+            elif self.tree.index(row[0]) != index:
+                self.tree.move(row[0], "", index)
+            self._request_thumbnail(row)
+
+    def load_next_page(self):
+        self.page_pending = False
+        if not self.has_more:
+            return
+        for row in self._fetch_page():
+            if not self.tree.exists(row[0]):
+                self.tree.insert("", "end", iid=row[0], values=self._row_values(row))
+                self._request_thumbnail(row)
+
+    def _request_thumbnail(self, row):
+        filename, mtime = row[0], row[2]
+        if filename in self.thumb_images:
+            return
+        self.thumbnails.request(filename, mtime, lambda f, path: self.thumb_events.put(("thumb", f, path)))
+
+    def _poll_thumbnails(self):
+        """
+        Descrição: Aplica as miniaturas prontas (algumas por vez, para não travar a interface) e reagenda.
+        Description: Applies finished thumbnails (a few at a time, so the UI never stalls) and reschedules.
+        """
+        for _ in range(30):
+            try:
+                kind, filename, path = self.thumb_events.get_nowait()
+            except queue.Empty:
+                break
+            if path is None:
+                continue
+            try:
+                if kind == "thumb" and self.tree.exists(filename):
+                    image = tk.PhotoImage(master=self, file=path)
+                    self.thumb_images[filename] = image
+                    self.tree.item(filename, image=image)
+                elif kind == "sheet" and filename == self.preview_file:
+                    self.preview_image = tk.PhotoImage(master=self, file=path)
+                    self.preview.config(image=self.preview_image, text="")
+            except Exception as e:
+                print(f"Erro ao exibir miniatura: {e}")
+        self.after(50, self._poll_thumbnails)
+
+    def destroy(self):
+        # Drop queued thumbnails so closing the app never waits on them
+        if self.thumbnails is not None:
+            self.thumbnails.shutdown()
+        tk.Frame.destroy(self)
+
+    def on_select(self, event):
+        """
+        Descrição: Gera (em segundo plano) a folha de contato do vídeo selecionado.
+        Description: Generates (in the background) the contact sheet of the selected video.
+        """
+        item = self.tree.selection()
+        if not item or self.thumbnails is None:
+            return
+        filename = item[0]
+        rows = self.catalog.rows([filename])
+        if not rows:
+            return
+        self.preview_file = filename
+        self.preview_image = None
+        self.preview.config(image="", text="Carregando prévia...")
+        self.thumbnails.request(filename, rows[0][2], lambda f, path: self.thumb_events.put(("sheet", f, path)), kind="sheet")
+
+    def _on_tree_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        # Near the bottom: pull the next page (after_idle keeps it out of the scroll callback)
+        if self.has_more and not self.page_pending and float(last) > 0.9:
+            self.page_pending = True
+            self.after_idle(self.load_next_page)
                 
     def clear_focus(self, event):
         self.focus_set()
 
     def filter_videos(self, event):
         """
-        Descrição: Filtra a lista de vídeos com base no texto digitado (busca por NF).
-        Description: Filters the video list based on typed text (search by NF).
+        Descrição: Filtra a lista de vídeos com base no texto digitado (busca por NF), após uma pausa na digitação.
+        Description: Filters the video list based on typed text (search by NF), once typing pauses.
         """
-        query = self.search_entry.get().lower()
-        
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-            
-        for vid in self.all_videos:
-            nf, f, date = vid
-            if query in nf.lower() or query in f.lower():
-                self.tree.insert("", "end", values=vid)
+        if self.search_job is not None:
+            self.after_cancel(self.search_job)
+        self.search_job = self.after(self.SEARCH_DEBOUNCE_MS, self.run_search)
+
+    def run_search(self):
+        self.search_job = None
+        if self.catalog is None:
+            return
+        query = self.search_entry.get().strip()
+        if query == self.query:
+            return
+        previous, previous_results = self.query, self.results
+        self.query = query
+        if query and self.search_index is not None:
+            # Refine the previous result when the query only grew
+            within = None
+            if previous_results is not None and len(previous) >= NFSearchIndex.GRAM and query.lower().startswith(previous.lower()):
+                within = previous_results
+            self.results = self.search_index.search(query, within=within)
+        else:
+            self.results = None
+        self.reset_view()
 
     def on_double_click(self, event):
         """
@@ -940,14 +4258,214 @@ class VideoGalleryPage(tk.Frame):
         item = self.tree.selection()
         if not item: return
         
-        vals = self.tree.item(item[0])["values"]
-        filename = vals[1]
+        filename = item[0] # Rows are keyed by filename
         filepath = os.path.join(self.video_dir, filename)
         
         if os.path.exists(filepath):
             os.startfile(filepath)
 
+def nf_from_video_filename(filename):
+    """
+    Descrição: Extrai o número da NF do nome do vídeo ("NF000123.mp4" ou "NF_000123_104037.mp4"), ou None.
+    Description: Extracts the NF number from the video name ("NF000123.mp4" or "NF_000123_104037.mp4"), or None.
+    """
+    match = re.match(r"NF_?(\d+)", os.path.basename(filename))
+    return match.group(1) if match else None
+
+def _reaudit_video_worker(job):
+    """
+    Descrição: (Processo do pool) Lê um vídeo de evidência e decodifica QR Codes em quadros amostrados.
+    Description: (Pool process) Streams an evidence video and decodes QR Codes on sampled frames.
+    """
+    path, expected_codes, sample_every, backend, cascade = job
+    cv2.setNumThreads(1) # One process per core already
+    result = {"path": path, "codes": {}, "frames": 0, "sampled": 0, "error": ""}
+
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        result["error"] = "Não foi possível abrir o vídeo"
+        return result
+
+    try:
+        decoder = make_decoder(backend, cascade)
+        while True:
+            # grab() for skipped frames avoids the pixel conversion of read()
+            if not cap.grab():
+                break
+            result["frames"] += 1
+            if (result["frames"] - 1) % sample_every != 0:
+                continue
+            ok, img = cap.retrieve()
+            if not ok:
+                break
+            result["sampled"] += 1
+            for obj in decoder.decode(img):
+                code = obj.data.decode("utf-8", errors="replace").strip()
+                result["codes"][code] = result["codes"].get(code, 0) + 1
+            # Stop early once a code belonging to the file's NF was seen
+            if expected_codes and any(code in expected_codes for code in result["codes"]):
+                break
+        result["decoder"] = decoder.stats()
+    except Exception as e:
+        result["error"] = str(e)
+    finally:
+        cap.release()
+    return result
+
+def reaudit_videos(video_dir, spreadsheet=None, report_path=".", workers=None, sample_every=5, backend="pyzbar", cascade=True):
+    """
+    Descrição: Re-audita em lote (sem interface) todos os vídeos de evidência usando um pool de processos e gera um relatório CSV.
+    Description: Headless batch re-audit of every evidence video using a process pool, writing a CSV reconciliation report.
+    """
+    videos = sorted(
+        os.path.join(video_dir, f) for f in os.listdir(video_dir) if f.lower().endswith(('.mp4', '.avi'))
+    ) if os.path.isdir(video_dir) else []
+    if not videos:
+        print(f"Nenhum vídeo encontrado em '{video_dir}'.")
+        return None
+
+    loader = DataLoader(spreadsheet) if spreadsheet else None
+    jobs = []
+    for path in videos:
+        nf = nf_from_video_filename(path)
+        expected = set(loader.find_by_nf(nf)) if loader and nf else set()
+        jobs.append((path, expected, max(1, sample_every), backend, cascade))
+
+    if not os.path.exists(report_path):
+        os.makedirs(report_path)
+    report_file = os.path.join(report_path, f"reauditoria_{datetime.datetime.now().strftime('%Y-%m-%d_%H%M%S')}.csv")
+
+    print(f"Re-auditando {len(jobs)} vídeos com {workers or os.cpu_count()} processos...")
+    counts = {}
+    start = time.time()
+    rows = []
+    decoder_stats = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_reaudit_video_worker, job) for job in jobs]
+        for done, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            if result.get("decoder", {}).get("calls"):
+                decoder_stats.append(result["decoder"])
+            row = _reconcile_video(result, loader)
+            rows.append(row)
+            counts[row[2]] = counts.get(row[2], 0) + 1
+            if done % 50 == 0 or done == len(futures):
+                print(f"  {done}/{len(futures)} vídeos ({time.time() - start:.1f}s)")
+
+    rows.sort(key=lambda r: r[0])
+    with open(report_file, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(["Arquivo", "NF_Arquivo", "Status", "Rastreios_Lidos", "NFs_Planilha", "Quadros", "Quadros_Amostrados", "Detalhe"])
+        writer.writerows(rows)
+
+    print(f"Relatório: {report_file}")
+    print("Resumo: " + ", ".join(f"{status}={n}" for status, n in sorted(counts.items())))
+    if decoder_stats:
+        calls = sum(d["calls"] for d in decoder_stats)
+        mean_ms = sum(d["mean_ms"] * d["calls"] for d in decoder_stats) / calls
+        print(f"Decodificador {decoder_stats[0]['backend']}: {calls} chamadas, média {mean_ms:.1f} ms, "
+              f"p95 {max(d['p95_ms'] for d in decoder_stats):.1f} ms (pior vídeo)")
+    return report_file
+
+def _reconcile_video(result, loader):
+    # Compares the NF in the filename with the codes seen in the video and the spreadsheet
+    filename = os.path.basename(result["path"])
+    nf_file = nf_from_video_filename(filename) or ""
+    codes = sorted(result["codes"])
+    nfs = []
+    status = "OK"
+    detail = result["error"]
+
+    if result["error"]:
+        status = "ERRO_LEITURA"
+    elif not codes:
+        status = "SEM_QR"
+    elif loader is None:
+        status = "SEM_PLANILHA"
+    else:
+        missing = []
+        for code in codes:
+            info = loader.check_tracking(code)
+            if info and info["found"]:
+                nfs.append(str(info["nf"]))
+            else:
+                missing.append(code)
+        if nf_file and nf_file in nfs:
+            status = "OK"
+        elif nfs:
+            status = "NF_DIVERGENTE"
+            detail = f"Vídeo mostra NF {', '.join(sorted(set(nfs)))}"
+        else:
+            status = "NAO_CONSTA"
+            detail = f"Rastreio(s) fora da planilha: {', '.join(missing)}"
+
+    return [filename, nf_file, status, " ".join(codes), " ".join(sorted(set(nfs))), result["frames"], result["sampled"], detail]
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Conferência Gueddai")
+    parser.add_argument("--reauditar", action="store_true", help="Re-audita os vídeos de evidência sem interface gráfica")
+    parser.add_argument("--videos", default="videos_auditoria", help="Pasta dos vídeos de evidência")
+    parser.add_argument("--planilha", default=None, help="Planilha de pedidos (.xlsx) para conferir as NFs")
+    parser.add_argument("--relatorio", default=".", help="Pasta onde o relatório será gravado")
+    parser.add_argument("--processos", type=int, default=None, help="Número de processos (padrão: núcleos da CPU)")
+    parser.add_argument("--amostragem", type=int, default=5, help="Decodifica 1 a cada N quadros")
+    parser.add_argument("--decodificador", default="pyzbar", choices=sorted(DECODER_BACKENDS), help="Backend de decodificação")
+    parser.add_argument("--cascata", default=None, choices=["sim", "nao"], help="Decodificação em cascata: reduzida, resolução total e contraste realçado (padrão: sim na re-auditoria, nao no scanner)")
+    parser.add_argument("--replay", default=None, help="Reproduz um vídeo ou pasta de imagens no scanner, sem janela e na velocidade máxima")
+    parser.add_argument("--perfil-gravacao", default="padrao", choices=sorted(RECORDING_PROFILES), help="Perfil de gravação das evidências (resolução, FPS, codec)")
+    parser.add_argument("--preroll", type=float, default=3.0, help="Segundos gravados antes do início da evidência (0 desativa)")
+    parser.add_argument("--preroll-mb", type=int, default=48, help="Memória máxima (MB) do buffer de pre-roll")
+    parser.add_argument("--cameras", default=None, help="Câmeras da estação separadas por vírgula (ex.: 0,1,2); requer --planilha")
+    args = parser.parse_args(argv)
+    if args.cameras and not args.planilha:
+        parser.error("--cameras requer --planilha")
+    return args
+
+def replay_footage(spec, spreadsheet, video_path, report_path, backend="pyzbar", profile="padrao", cascade=False,
+                   preroll_seconds=3.0, preroll_max_mb=48):
+    """
+    Descrição: Executa o scanner sobre imagens gravadas (sem câmera/janela) e imprime as métricas de throughput.
+    Description: Runs the scanner over recorded footage (no camera/window) and prints the throughput metrics.
+    """
+    loader = DataLoader(spreadsheet) if spreadsheet else DataLoader("")
+    scanner = BarcodeScanner(loader, video_path=video_path, report_path=report_path,
+                             decoder_backend=backend, decoder_cascade=cascade, source=open_frame_source(spec), replay=True,
+                             recording_profile=profile, preroll_seconds=preroll_seconds, preroll_max_mb=preroll_max_mb)
+    scanner.run()
+    print(json.dumps(scanner.run_stats, indent=2))
+    return scanner.run_stats
+
+def run_multi_camera(specs, spreadsheet, video_path, report_path, backend="pyzbar", profile="padrao", cascade=False,
+                     preroll_seconds=3.0, preroll_max_mb=48):
+    """
+    Descrição: Executa uma estação com várias câmeras (uma janela por bancada), compartilhando planilha, duplicatas e log.
+    Description: Runs a station with several cameras (one window per bench), sharing spreadsheet, duplicates and log.
+    """
+    loader = DataLoader(spreadsheet)
+    sources = [open_frame_source(spec.strip()) for spec in specs.split(",") if spec.strip()]
+    station = MultiCameraStation(loader, sources, video_path=video_path, report_path=report_path,
+                                 decoder_backend=backend, decoder_cascade=cascade, recording_profile=profile,
+                                 preroll_seconds=preroll_seconds, preroll_max_mb=preroll_max_mb)
+    return station.run()
+
 if __name__ == "__main__":
-    from tkinter import ttk # Import ttk here
-    app = App()
-    app.mainloop()
\ No newline at end of file
+    args = parse_args()
+    if args.reauditar:
+        reaudit_videos(args.videos, args.planilha, args.relatorio, args.processos, args.amostragem, args.decodificador,
+                       args.cascata != "nao")
+    elif args.replay:
+        replay_footage(args.replay, args.planilha, os.path.join(args.relatorio, "replay_videos"), args.relatorio, args.decodificador,
+                       args.perfil_gravacao, args.cascata == "sim", args.preroll, args.preroll_mb)
+    elif args.cameras:
+        run_multi_camera(args.cameras, args.planilha, args.videos, args.relatorio, args.decodificador, args.perfil_gravacao,
+                         args.cascata == "sim", args.preroll, args.preroll_mb)
+    else:
+        from tkinter import ttk # Import ttk here
+        app = App(scanner_options={
+            "decoder_backend": args.decodificador,
+            "decoder_cascade": args.cascata == "sim",
+            "recording_profile": args.perfil_gravacao,
+            "preroll_seconds": args.preroll,
+            "preroll_max_mb": args.preroll_mb,
+        })
+        app.mainloop()
\ No newline at end of file